@@ -0,0 +1,105 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from Game_Display import GD
+
+
+class ArrayGD(GD):
+    """
+    GD whose Display Map is a 2D numpy array of unicode code points
+    instead of a list of lists of characters. Painting a symbol is a
+    slice assignment and rows only become strings when they are printed.
+    Needs numpy.
+    """
+
+    # Overrides GD attribute, also sharing the encoded pictures
+    tables = ('_sprites', '_pics')
+
+    def __init__(self, map, symbols, display=None):
+        if np is None:
+            raise ImportError("ArrayGD needs numpy, try: pip install numpy")
+
+        # Encoded pictures, filled by compile
+        self._pics = {}
+        super(ArrayGD, self).__init__(map, symbols, display)
+
+    def encode(self, lines):
+        """Turns a list of equally long strings into a uint32 array"""
+        return np.array([np.frombuffer(i.encode('utf-32-le'), dtype='<u4')
+                         for i in lines])
+
+    def compile(self, symbol, symbol_num, rows):
+        """Overrides GD method, also storing the picture encoded"""
+        super(ArrayGD, self).compile(symbol, symbol_num, rows)
+        pic = self.encode(rows)
+        pic.setflags(write=False)
+        self._pics[self.sprite(symbol, symbol_num)] = pic
+
+    def trans_map(self, map):
+        """Overrides GD method, returning the map as an array"""
+        new_map = super(ArrayGD, self).trans_map(map)
+        return self.encode([''.join(i) for i in new_map])
+
+    def copy_map(self, map):
+        """Overrides GD method, copying the array"""
+        return map.copy()
+
+    def load_map(self, display, width):
+        """Overrides GD method, the array uses *display* without copying"""
+        return np.frombuffer(display, dtype='<u4').reshape(-1, width)
+
+    def insert_rows(self, rows):
+        """Overrides GD method, moving the arrays down in place"""
+        n = len(rows)
+        self.own_background()
+        for layer in (self.map, self.background):
+            layer[n:] = layer[:-n]
+            layer[:n] = self.encode(rows)
+
+    def rows(self, y_range, x_range):
+        """Overrides GD method, decoding only the rows that are printed"""
+        width = self.map.shape[1]
+        columns = np.arange(x_range[0], min(x_range[1], width))
+        rows = []
+
+        for y in range(y_range[0], min(y_range[1], self.map.shape[0])):
+            shift = self.offsets.get(y - y % self.size[0])
+            if shift:
+                row = self.map[y, (columns - shift) % width]
+            else:
+                row = self.map[y, x_range[0]:x_range[1]]
+            rows.append(row.tobytes().decode('utf-32-le'))
+        return rows
+
+    def paint(self, sprite, y, x, layer=None):
+        """Overrides GD method, paints with one slice assignment, or two
+        if the picture goes over the right edge and wraps around
+        """
+        if layer is None:
+            layer = self.map
+        pic = self._pics[sprite]
+        height, width = pic.shape
+        end = x + width
+        map_width = layer.shape[1]
+
+        if end <= map_width:
+            layer[y:y + height, x:end] = pic
+        else:
+            split = map_width - x
+            layer[y:y + height, x:] = pic[:, :split]
+            layer[y:y + height, :end - map_width] = pic[:, split:]
+
+    def uncover(self, y, x, width):
+        """Overrides GD method, copying with slice assignments"""
+        end = x + width
+        map_width = self.map.shape[1]
+        lines = slice(y, y + self.size[0])
+
+        if end <= map_width:
+            self.map[lines, x:end] = self.background[lines, x:end]
+        else:
+            self.map[lines, x:] = self.background[lines, x:]
+            self.map[lines, :end - map_width] = \
+                self.background[lines, :end - map_width]
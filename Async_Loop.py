@@ -0,0 +1,144 @@
+import time
+import asyncio
+import traceback
+
+from Frogger import Game, maze2, symbols
+from Pacing import Pacer
+
+
+async def simulate(game, TPS):
+    """
+    Updates the game *TPS* times per second. Ticks follow the fixed
+    schedule of a Pacer, so sleeping late doesn't add up over time and a
+    stall doesn't end in a burst of ticks.
+
+    :param game: <Game> The game to update
+    :param TPS: <int> Ticks per second
+    """
+    pacer = Pacer(TPS, profiler=game.profiler)
+
+    while True:
+        try:
+            for tick in range(pacer.due()):
+                game.step()
+        except SystemExit:
+            # Game.kill was called, the game is over
+            return None
+
+        # Sleep until the next tick is due, at least yield to the renderer
+        await asyncio.sleep(max(pacer.delay(), 0))
+
+
+def send(out, text):
+    """
+    Sends the frame *text* to *out*, runs in a worker thread
+
+    :return: <float> Seconds it took
+    """
+    start = time.perf_counter()
+    out.send(text)
+    return time.perf_counter() - start
+
+
+async def render(game, FPS, out=None):
+    """
+    Prints the game *FPS* times per second. Frames are put together here,
+    but sent to the terminal in a worker thread so a slow terminal never
+    holds up the simulation. While the last frame is still being sent,
+    frames are skipped. Game.dead writes to *out* on this thread as well:
+    its send waits for the frame being sent, and frames sent after the
+    game closed *out* are dropped.
+
+    :param game: <Game> The game to print
+    :param FPS: <int> Frames per second
+    :param out: <TerminalWriter> Where to write the frames, game.out if None
+    """
+    if out is None:
+        out = game.out
+    prof = game.profiler
+    loop = asyncio.get_running_loop()
+    writing = None
+    # Time taken to render the frame being written
+    rendered = 0.0
+    next_frame = loop.time()
+
+    while True:
+        if writing is None or writing.done():
+            if writing is not None:
+                # Raises anything that went wrong while writing
+                flushed = writing.result()
+                if prof is not None:
+                    prof.record('flush', flushed)
+                    prof.record('frame', rendered + flushed)
+
+            start = time.perf_counter()
+            out.write(game.render_game())
+            text = out.take()
+            rendered = time.perf_counter() - start
+            if prof is not None:
+                prof.record('render', rendered)
+            writing = loop.run_in_executor(None, send, out, text)
+            game.frame += 1
+        else:
+            game.dropped += 1
+            if game.profiler is not None:
+                game.profiler.count('dropped frames')
+
+        # If we fell behind don't try to make up for missed frames
+        next_frame = max(next_frame + 1 / FPS, loop.time())
+        await asyncio.sleep(next_frame - loop.time())
+
+
+async def play(game, FPS, TPS):
+    """Runs the simulation and rendering of *game* side by side"""
+    loop = asyncio.get_running_loop()
+
+    # Read keys as soon as they arrive, on Windows they are polled by
+    # Game.action every tick instead
+    game.keys.start()
+    try:
+        loop.add_reader(game.keys.fileno(), game.keys.poll)
+        reading = True
+    except NotImplementedError:
+        reading = False
+    game.watch_size()
+
+    game.start = time.perf_counter()
+    game.frame = 1
+    game.dropped = 0
+    tasks = [asyncio.ensure_future(simulate(game, TPS)),
+             asyncio.ensure_future(render(game, FPS))]
+    try:
+        done, pending = await asyncio.wait(
+            tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if reading:
+            loop.remove_reader(game.keys.fileno())
+
+
+def main_loop(game, FPS=40, TPS=70):
+    """
+    The asyncio version of Game.main_loop
+
+    :param game: <Game> The game to run
+    :param FPS: <int> Frames per second
+    :param TPS: <int> Ticks per second
+    """
+    # Clear screen once at the beginning
+    game.out.clear()
+    try:
+        asyncio.run(play(game, FPS, TPS))
+    except KeyboardInterrupt:
+        game.kill()
+    except Exception:
+        # Give the terminal back before going down
+        traceback.print_exc()
+        game.kill()
+
+
+if __name__ == "__main__":
+    main_loop(Game(maze2, symbols))
@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import collections
+import multiprocessing
+
+from Frogger import maze2, symbols
+from Simulation import HeadlessGame, HeadlessEndlessGame, run, scale_map
+
+
+def random_moves(seed, count, keys):
+    """Returns *count* keys picked from *keys*, the same for the same seed"""
+    rng = random.Random(seed)
+    return ''.join(rng.choice(keys) for i in range(count))
+
+
+def play(job):
+    """
+    Plays one headless game, runs in a worker process. The seed decides the
+    speeds of the objects, the random moves and the endless map.
+
+    :param job: <tuple> seed, ticks, every, moves (None for random ones),
+                keys to pick random moves from, endless, width and height
+    :return: <dict> Seed, why the game ended (None if the player survived),
+             ticks survived and lines the player got up
+    """
+    seed, ticks, every, moves, keys, endless, width, height = job
+
+    random.seed(seed)
+    if endless:
+        game = HeadlessEndlessGame(symbols, seed, len(maze2) * height,
+                                   len(maze2[0]) * width)
+    else:
+        game = HeadlessGame(scale_map(maze2, width, height), symbols)
+    if moves is None:
+        moves = random_moves(seed, ticks // every + 1, keys)
+
+    start = game.player.coords[0]
+    stats = run(game, ticks, moves, every)
+    lines = (start - game.player.coords[0]) // game.GD.size[0]
+
+    return {'seed': seed,
+            'death': stats['death'],
+            'ticks': stats['ticks'],
+            'distance': lines + getattr(game, 'distance', 0)}
+
+
+class Summary(object):
+    """Adds up the results of games as they come in"""
+
+    def __init__(self):
+        self.games = 0
+        # Games and ticks survived by how they ended
+        self.outcomes = collections.Counter()
+        self.ticks = collections.Counter()
+        self.distances = []
+
+    def add(self, result):
+        outcome = result['death'] or "survived"
+        self.games += 1
+        self.outcomes[outcome] += 1
+        self.ticks[outcome] += result['ticks']
+        self.distances.append(result['distance'])
+
+    def lines(self):
+        """Returns the summary as a list of table lines"""
+        lines = ["{:<36} {:>7} {:>7} {:>11}".format(
+            "outcome", "games", "share", "mean ticks")]
+        for outcome, games in self.outcomes.most_common():
+            lines.append("{:<36} {:>7} {:>6.1f}% {:>11.1f}".format(
+                outcome, games, games / self.games * 100,
+                self.ticks[outcome] / games))
+
+        if self.distances:
+            ordered = sorted(self.distances)
+            lines.append("distance: mean {:.2f}  median {}  max {}".format(
+                sum(ordered) / len(ordered), ordered[len(ordered) // 2],
+                ordered[-1]))
+        return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play many headless games on all cores and sum up "
+                    "how they end")
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('-t', '--ticks', type=int, default=2000,
+                        help="ticks per game")
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help="game n is played with seed SEED + n")
+    parser.add_argument('-m', '--moves', default=None,
+                        help="scripted keys (w, a, s, d) for every game, "
+                             "others mean wait; random if not given")
+    parser.add_argument('-k', '--keys', default='wwwwasd  ',
+                        help="keys random moves are picked from")
+    parser.add_argument('-e', '--every', type=int, default=10,
+                        help="ticks between two moves")
+    parser.add_argument('-W', '--width', type=int, default=1,
+                        help="tile the map this many times horizontally")
+    parser.add_argument('-H', '--height', type=int, default=1,
+                        help="tile the map this many times vertically")
+    parser.add_argument('--endless', action='store_true',
+                        help="play generated maps without end")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="worker processes")
+    parser.add_argument('-o', '--out', metavar='FILE',
+                        help="write every result to FILE as JSON lines")
+    parser.add_argument('-i', '--interval', type=float, default=5,
+                        help="seconds between summaries while running")
+    args = parser.parse_args(argv)
+
+    jobs = [(args.seed + n, args.ticks, args.every, args.moves, args.keys,
+             args.endless, args.width, args.height)
+            for n in range(args.games)]
+    # Bigger chunks mean less talking between processes
+    chunk = max(1, args.games // (args.jobs * 8))
+
+    summary = Summary()
+    out = open(args.out, 'w') if args.out else None
+    start = shown = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.jobs) as pool:
+            for result in pool.imap_unordered(play, jobs, chunk):
+                summary.add(result)
+                if out is not None:
+                    out.write(json.dumps(result) + '\n')
+
+                now = time.perf_counter()
+                if now - shown > args.interval:
+                    shown = now
+                    print("{}/{} games".format(summary.games, args.games),
+                          *summary.lines(), sep='\n', end='\n\n',
+                          file=sys.stderr)
+    finally:
+        if out is not None:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print("Games: {}  Time: {:.3f}s  Games/sec: {:.1f}".format(
+        summary.games, elapsed, summary.games / elapsed if elapsed else 0))
+    print('\n'.join(summary.lines()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import random
+import argparse
+
+from Frogger import Game, ENTITIES, symbols
+from Game_Display import GD
+from Lanes import Lane, build_lanes
+from Level import scan_map
+from Profiler import Profiler
+
+
+# Kinds of lines: background, moving symbol (None for none), how many
+# symbols make up one object, smallest and largest gap between objects and
+# how often the kind is picked
+KINDS = {
+    'grass':     (' ', None, 0, 0, 0, 2),
+    'road':      ('_', 'u', 1, 1, 3, 3),
+    'fast road': ('_', 'p', 1, 8, 14, 1),
+    'river':     ('^', 'o', 3, 2, 5, 3),
+    'snakes':    (' ', 's', 3, 4, 8, 1),
+}
+
+
+class LaneGenerator(object):
+    """
+    Makes up the lines of an endless Symbol Map. Line n only depends on
+    the seed and n, so the same seed always gives the same map.
+    """
+
+    def __init__(self, width, seed=None, safe=3):
+        """
+        :param width: <int> Length of a line
+        :param seed: <int> Seed of the map, a random one if None
+        :param safe: <int> How many lines at the start are only grass
+        """
+        self.width = width
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.safe = safe
+        self.kinds = sorted(KINDS)
+
+    def line(self, n):
+        """
+        Returns line *n*, counting up from the first one
+
+        :return: <tuple> The line as a string and the direction ('L' or
+                 'R') its objects move in
+        """
+        rng = random.Random('{}:{}'.format(self.seed, n))
+        if n < self.safe:
+            kind = 'grass'
+        else:
+            weights = [KINDS[i][5] for i in self.kinds]
+            kind = rng.choices(self.kinds, weights)[0]
+        background, symbol, length, gap, max_gap, weight = KINDS[kind]
+
+        line = [background] * self.width
+        if symbol is not None:
+            x = first = rng.randint(0, max_gap)
+            # Keep the gap around the edge too, the line wraps around
+            end = min(self.width, self.width + first - gap)
+            while x + length <= end:
+                line[x:x + length] = symbol * length
+                x += length + rng.randint(gap, max_gap)
+
+        return ''.join(line), rng.choice('LR')
+
+
+class EndlessGame(Game):
+    """
+    Game on a map without end, its lines are made up by a LaneGenerator as
+    the player goes up. The map keeps its size: once the player is more
+    than *behind* lines away from the bottom, everything moves one line
+    down, the bottom line and its objects are dropped and a new line comes
+    in at the top. Memory stays the same however far the player gets.
+    """
+
+    # The map is made up as the game goes and differs by seed, a shared
+    # background layer would be copied at the first shift and never freed
+    share_ground = False
+
+    def __init__(self, symbols, seed=None, height=11, width=12, behind=2,
+                 Display=GD, lanes=True):
+        """
+        :param symbols: <dict> Contains all the graphics for our symbols
+        :param seed: <int> Seed of the map, a random one if None
+        :param height: <int> Lines of the map kept at a time
+        :param width: <int> Length of the lines
+        :param behind: <int> Lines kept below the player
+        :param Display: <type> Game display class, GD or a subclass of it
+        :param lanes: <bool> Move rows of similar objects together as Lanes
+        """
+        self.generator = LaneGenerator(width, seed, behind + 2)
+        self.behind = behind
+        self.use_lanes = lanes
+
+        lines = [self.generator.line(n) for n in range(height)][::-1]
+        map = [line for line, dire in lines]
+        # The player starts in the middle of its line
+        row = height - 1 - behind
+        map[row] = map[row][:width // 2] + 'H' + map[row][width // 2 + 1:]
+        super(EndlessGame, self).__init__(map, symbols, Display, lanes)
+
+        for row, (line, dire) in enumerate(lines):
+            self.add_objects(row, line, dire)
+
+        # How many lines were made so far and how far the player went up
+        self.lines = height
+        self.distance = 0
+
+    def scan(self):
+        """Overrides Game method, objects are added line by line instead"""
+        return {}, scan_map(self.act_map, {}, 'H')[1].get('H')
+
+    def add_objects(self, row, line, dire):
+        """
+        Creates the objects in *line*, which is act_map line *row*. They all
+        move in direction *dire* at the same speed, so the line can move as
+        a Lane.
+        """
+        lengths = {symbol: length for symbol, length, Object, group
+                   in ENTITIES}
+        found = scan_map([line], lengths)[0]
+
+        things = []
+        for symbol, length, Object, group in ENTITIES:
+            new = [Object([(row, x) for y, x in coords], dire, self)
+                   for coords, d in found[symbol]]
+            for thing in new[1:]:
+                thing.speed = new[0].speed
+            getattr(self, group).extend(new)
+            things += new
+        self.ground(things)
+
+        movers = build_lanes(things, self) if self.use_lanes else things
+        # A new list, so whoever goes through the old one sees a change
+        self.movers = self.movers + movers
+        for mover in movers:
+            self.bands.setdefault(mover.y, []).append(mover)
+
+    def advance(self):
+        """Drops the bottom line and moves everything down to make room for
+        the next line at the top
+        """
+        height = self.GD.size[0]
+        bottom = (len(self.act_map) - 1) * height
+
+        gone = self.bands.pop(bottom, [])
+        if gone:
+            self.movers = [i for i in self.movers if i not in gone]
+            for group in set(i[3] for i in ENTITIES):
+                things = getattr(self, group)
+                for thing in things:
+                    if thing.y == bottom:
+                        self.entities.remove(thing.id)
+                setattr(self, group, [i for i in things if i.y != bottom])
+
+        line, dire = self.generator.line(self.lines)
+        self.lines += 1
+        self.GD.shift(line)
+        self.entities.lower(height)
+        self.player.coords[0] += height
+        for mover in self.movers:
+            if isinstance(mover, Lane):
+                mover.lower(height)
+        self.bands = {y + height: movers for y, movers in self.bands.items()}
+
+        self.add_objects(0, line, dire)
+        self.distance += 1
+
+    def player_moved(self):
+        """Overrides Game method, moves the map down while the player is
+        too far up
+        """
+        top = (len(self.act_map) - 1 - self.behind) * self.GD.size[0]
+        while self.player.coords[0] < top:
+            self.advance()
+
+    def overlay_lines(self):
+        """Overrides Game method, adding how far the player got"""
+        lines = super(EndlessGame, self).overlay_lines()
+        return ["Distance: {}".format(self.distance)] + lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Endless Frogger")
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('--profile', action='store_true',
+                        help="show loop timings below the game")
+    args = parser.parse_args()
+
+    game = EndlessGame(symbols, args.seed)
+    if args.profile:
+        game.profiler = Profiler()
+    game.main_loop()
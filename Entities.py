@@ -0,0 +1,162 @@
+from array import array
+
+
+def moves_after(cycle, speed, ticks):
+    """
+    Works out what *ticks* more updates do to something that moves once
+    every *speed* updates and is at *cycle* (1 to speed) of its cycle
+
+    :return: <tuple> How many times it moves and its new cycle
+    """
+    done = cycle - 1 + ticks
+    return done // speed, done % speed + 1
+
+
+class EntityStore(object):
+    """
+    Holds the state of every moving Thing in flat arrays instead of one
+    Python object per value. Pieces (one map unit of a Thing) are stored in
+    y and x, everything else once per entity, indexed by the entity id.
+    Things are thin views over their id in here.
+    """
+
+    def __init__(self):
+        # Display map coords of every piece
+        self.y = array('l')
+        self.x = array('l')
+
+        # Per entity: index of its first piece and how many it has
+        self.first = array('l')
+        self.length = array('l')
+        # Per entity: direction (+1/-1), update every *speed* cycles and
+        # the current cycle
+        self.move = array('b')
+        self.speed = array('b')
+        self.cycle = array('b')
+
+        # Ids of removed entities by number of pieces, add reuses them
+        self.free = {}
+
+    def __len__(self):
+        return len(self.first)
+
+    def add(self, coords, move, speed):
+        """
+        Adds an entity
+
+        :param coords: <list> Display map [y, x] coords of each piece
+        :param move: <int> +1 to move right, -1 to move left
+        :param speed: <int> Move once every *speed* cycles
+        :return: <int> The id of the new entity
+        """
+        free = self.free.get(len(coords))
+        if free:
+            id = free.pop()
+            first = self.first[id]
+            for i, (y, x) in enumerate(coords):
+                self.y[first + i] = y
+                self.x[first + i] = x
+
+            self.move[id] = move
+            self.speed[id] = speed
+            self.cycle[id] = 1
+            return id
+
+        self.first.append(len(self.x))
+        self.length.append(len(coords))
+        for y, x in coords:
+            self.y.append(y)
+            self.x.append(x)
+
+        self.move.append(move)
+        self.speed.append(speed)
+        self.cycle.append(1)
+        return len(self.first) - 1
+
+    def remove(self, id):
+        """Frees entity *id*, a later add with as many pieces takes its place"""
+        self.free.setdefault(self.length[id], []).append(id)
+
+    def lower(self, lines):
+        """Moves every piece *lines* display map lines down"""
+        for i in range(len(self.y)):
+            self.y[i] += lines
+
+    def skip(self, id, ticks, width):
+        """
+        Advances entity *id* as if it was updated *ticks* times, without
+        stepping through them: its position only depends on how many times
+        it moved, which follows from its cycle and speed
+
+        :param width: <int> Width of the map the pieces wrap around in
+        :return: <int> How many times the entity moved
+        """
+        moves, self.cycle[id] = moves_after(self.cycle[id], self.speed[id],
+                                            ticks)
+        if moves:
+            step = self.move[id] * moves
+            first, length = self.first[id], self.length[id]
+            for p in range(first, first + length):
+                self.x[p] = (self.x[p] + step) % width
+        return moves
+
+    def pieces(self, id):
+        """Returns a view of the coords of all pieces of entity *id*"""
+        return Pieces(self, self.first[id], self.length[id])
+
+
+class Pieces(object):
+    """Acts like a list of [y, x] coords, one per piece of an entity"""
+    __slots__ = ('store', 'first', 'length')
+
+    def __init__(self, store, first, length):
+        self.store = store
+        self.first = first
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("piece index out of range")
+        return Piece(self.store, self.first + i)
+
+    def __iter__(self):
+        for i in range(self.first, self.first + self.length):
+            yield Piece(self.store, i)
+
+
+class Piece(object):
+    """Acts like the [y, x] coords list of one piece"""
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        yield self.store.y[self.index]
+        yield self.store.x[self.index]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(self)[key]
+        return (self.store.y, self.store.x)[key][self.index]
+
+    def __setitem__(self, key, value):
+        (self.store.y, self.store.x)[key][self.index] = value
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
@@ -1,51 +1,83 @@
-import os
 import time
 import random
-import threading
+import shutil
+import signal
+import argparse
 import traceback
 
+import Snapshot
 from Game_Display import GD
-from getch import getch
-
-class StoppableThread(threading.Thread):
-    """Thread class with a stop() method. The thread itself has to check
-    regularly for the stopped() condition."""
-
-    def __init__(self, target, args):
-        super(StoppableThread, self).__init__(target=target, args=args)
-        self._stop_event = threading.Event()
-
-    def stop(self):
-        self._stop_event.set()
-
-    def stopped(self):
-        return self._stop_event.is_set()
+from Level import Level, scan_map
+from Entities import EntityStore
+from Lanes import build_lanes
+from Pacing import Pacer
+from Output import TerminalWriter, CastWriter, CLEAR
+from Profiler import Profiler
+from getch import KeyReader
 
 class Game(object):
 
-    def __init__(self, map, symbols):
+    # Games made from the same map share their background layer, see
+    # GD.share_background
+    share_ground = True
+
+    def __init__(self, map, symbols, Display=GD, lanes=True, level=None):
         """
         Initialize the game
 
-        :param map: <list> A list of strings containing simple map
+        :param map: <list> A list of strings containing simple map,
+                    ignored if *level* is given
         :param symbols: <dict> Contains all the graphics for our symbols
+        :param Display: <type> Game display class, GD or a subclass of it
+        :param lanes: <bool> Move rows of similar objects together as Lanes
+        :param level: <Level> Compiled level to load instead of *map*
         """
         # Initialize game display, includes the Display Map
-        self.GD = GD(map, symbols)
+        self.level = level
+        if level is None:
+            self.GD = Display(map, symbols)
+        else:
+            self.GD = Display(level.map, symbols, level.view())
         # GD makes a copy of the Symbol Map as a list of lists
         self.act_map = self.GD.act_map
 
-        #Initialize the different objects in the map
-        self.player = Player('H', self)
-        self.logs = self.init_objects('o', 3, Log)
-        self.cars = self.init_objects('u', 1, Car)
-        self.cars.append(self.init_objects('p', 1, SpeedCar)[0])
-        self.snakes = self.init_objects('s', 3, Snake)
-
-        # Initialize shared list between __main__ and thread for input
-        self.input = [None]
-        self.thread = StoppableThread(target=self.get_input,
-                                        args=(self.input, ))
+        #Initialize the different objects in the map, moving objects keep
+        #their state in one shared store
+        self.entities = EntityStore()
+        found, start = self.scan()
+        self.player = Player('H', self, start)
+
+        # Everything that moves, in update order, and every type of object
+        # on its own (self.logs, self.cars, ...)
+        self.movers = self.init_objects(found)
+        if self.share_ground:
+            self.GD.share_background(self.paint_ground)
+        else:
+            self.paint_ground()
+        if lanes:
+            self.movers = build_lanes(self.movers, self)
+
+        # Movers by the top line of the map unit they move in
+        self.bands = {}
+        for mover in self.movers:
+            self.bands.setdefault(mover.y, []).append(mover)
+
+        # Keys pressed since the last tick, read without blocking, and
+        # where frames are written, see Output
+        self.keys = KeyReader()
+        self.out = TerminalWriter()
+
+        # Lines and columns of the terminal, None until asked and again
+        # after it was resized, see screen_size
+        self.geometry = None
+        # Optional Profiler timing every phase of the loop, and the seconds
+        # spent painting sprites this tick, see time_blits
+        self.profiler = None
+        self.blit = None
+        # How many times the map was updated
+        self.tick = 0
+        # Tick and picture of every animated type of object, see picture
+        self.pictures = {}
 
     def find(self, symbol):
         """
@@ -59,51 +91,112 @@ class Game(object):
                 return [i, x.index(symbol)]
         return None
 
-    def init_objects(self, symbol, length, Object):
+    def scan(self):
         """
-        Initialize all objects of type "Object" in the game map
+        Finds the player and the objects of every type in ENTITIES with
+        one pass over act_map, the objects of a compiled level are read
+        from it instead
 
-        :param symbol: <char> Symbol of the object
-        :param length: <int> How many symbols one object has in the map
-        :param Object: <type> Name of the Class from which to create object
-        :return: <list> Returns a list of all objects of one type in map
+        :return: <tuple> (coords, direction) of the objects by symbol and
+                 the act_map [y, x] coords of the player
         """
-        objects = []
-        dire = 'R'
+        lengths = {symbol: length for symbol, length, Object, group
+                   in ENTITIES}
+        if self.level is not None:
+            found = {symbol: self.level.objects(symbol) for symbol in lengths}
+            return found, self.find('H')
 
-        for i in range(len(self.act_map)):
-            count = 0
-            coords = []
-            # Switch the direction every new line
-            dire = 'R' if dire == 'L' else 'L'
+        found, first = scan_map(self.act_map, lengths, 'H')
+        return found, first.get('H')
 
-            for j in range(len(self.act_map[i])):
+    def init_objects(self, found):
+        """
+        Initialize all objects in the game map
 
-                if self.act_map[i][j] == symbol:
-                    count += 1
-                    coords.append((i, j))
-                if count == length:
-                    n_obj = Object(coords, dire, self)
-                    objects.append(n_obj)
-                    count = 0
-                    coords = []
+        :param found: <dict> (coords, direction) of the objects by symbol,
+                      as returned by scan
+        :return: <list> All objects, types in the order of ENTITIES
+        """
+        for symbol, length, Object, group in ENTITIES:
+            setattr(self, group, [])
 
+        objects = []
+        for symbol, length, Object, group in ENTITIES:
+            new = [Object(coords, dire, self)
+                   for coords, dire in found.get(symbol, ())]
+            # Objects of a type in one row move at the speed of the first,
+            # so they never drive through each other (see scale_map)
+            speeds = {}
+            for thing in new:
+                thing.speed = speeds.setdefault(thing.y, thing.speed)
+            getattr(self, group).extend(new)
+            objects += new
         return objects
 
+    def paint_ground(self):
+        """Paints what is under the objects and the player into the
+        background layer of the Game Display
+        """
+        self.ground(self.movers)
+        self.GD.ground(self.GD.to_act(self.player.coords), self.player.replace)
+
+    def ground(self, things):
+        """Paints what is under *things* into the background layer of the
+        Game Display, it shows wherever they move away from
+        """
+        for thing in things:
+            for coords in thing.coords:
+                self.GD.ground(self.GD.to_act(coords), thing.replace)
+
     def print_game(self, normal=False):
         """
         Prints Display Map in players environment with info
         """
-        y_range, x_range = self.player_env(100, len(self.GD.map[0]))
-        self.GD.print_map(y_range, x_range)
+        prof = self.profiler
+        if prof is None:
+            self.out.write(self.render_game())
+            self.out.flush()
+            return None
 
-        # for i in self.act_map:
-            # print(''.join(i))
+        start = prof.clock()
+        text = self.render_game()
+        rendered = prof.clock()
+        self.out.write(text)
+        self.out.flush()
+        done = prof.clock()
 
-        p_coords = self.player.coords
-        actp_coords = self.GD.trans_coords(p_coords, "disp_map")
-        c_coords = self.cars[0].coords[0]
-        actc_coords = self.GD.trans_coords(c_coords, "disp_map")
+        prof.record('render', rendered - start)
+        prof.record('flush', done - rendered)
+        prof.record('frame', done - start)
+
+    def render_game(self):
+        """
+        Returns the text print_game writes: the Display Map in players
+        environment with info
+        """
+        lines = self.overlay_lines()
+
+        # Show as much of the map around the player as fits in the terminal
+        # above the help and overlay lines
+        height, width = self.screen_size()
+        rows = max(height - 1 - len(lines), self.GD.size[0])
+        y_range, x_range = self.player_env(rows // 2, width // 2)
+
+        # Parts of the map that were off screen may be out of date
+        for y in self.GD.set_view(y_range, x_range):
+            self.repaint_band(y)
+
+        out = self.GD.render(y_range, x_range)
+        out += "Up[w], Down[s], Left[a], Right[d] or Exit[x]\n"
+        # Clear the rest of each line, the overlay changes width
+        out += ''.join(i + "\033[K\n" for i in lines)
+
+        return out
+
+    def overlay_lines(self):
+        """Returns the profiler overlay lines, if there is one to show"""
+        if self.profiler is None or not self.profiler.overlay:
+            return []
 
         time_elapsed = round(time.perf_counter() - self.start, 2)
         if time_elapsed > 1:
@@ -111,16 +204,82 @@ class Game(object):
         else:
             fps = 0
 
-        # print("Yrange and xrange: {} {}".format(y_range,x_range))
-        # print("Player coords: {}".format(p_coords))
-        # print("Act_map player coords: {}".format(actp_coords))
-        # print("First car coords: {}".format(c_coords))
-        # print("Act_map car coords: {}".format(actc_coords))
-        # print("Time elapsed: {}".format(time_elapsed))
-        # print("FPS: {}".format(round(fps, 2)))
+        p_coords = self.player.coords
+        actp_coords = self.GD.to_act(p_coords)
 
-        print("Up[w], Down[s], Left[a], Right[d] or Exit[x]")
+        lines = ["Time elapsed: {}  FPS: {}".format(time_elapsed,
+                                                    round(fps, 2)),
+                 "Player coords: {} Act_map: {}".format(p_coords,
+                                                        actp_coords)]
+        return lines + self.profiler.lines()
 
+    def screen_size(self):
+        """
+        Returns the size of the terminal as (lines, columns), or the size
+        of the whole map if we are not in a terminal. The terminal is only
+        asked the first time and after it was resized, and the frame after
+        that is repainted in full.
+        """
+        if self.geometry is None:
+            size = shutil.get_terminal_size((len(self.GD.map[0]),
+                                             len(self.GD.map) + 1))
+            self.geometry = size.lines, size.columns
+            # The terminal may have wrapped or cut the last frame
+            self.GD.invalidate()
+        return self.geometry
+
+    def resized(self, *args):
+        """Handler for SIGWINCH, the next frame asks for the new size"""
+        self.geometry = None
+
+    def watch_size(self):
+        """Has resized called when the terminal is resized, where there is
+        a signal for it
+        """
+        if hasattr(signal, 'SIGWINCH'):
+            signal.signal(signal.SIGWINCH, self.resized)
+
+    def repaint_band(self, y, background=False):
+        """
+        Repaints the map unit with top line *y* from the action map and
+        the moving objects in it, after it was out of view. A Lane only
+        repaints its pieces, unless *background* asks for everything.
+        """
+        movers = self.bands.get(y, ())
+        things = [i for i in movers if isinstance(i, Thing)]
+        if things or background:
+            # Start from the background, then put every sprite on it
+            self.GD.erase_unit(y)
+        for mover in movers:
+            mover.repaint()
+        # Movers only paint themselves, the player goes on top
+        if self.player.coords[0] == y:
+            self.GD.display(self.player.sym, self.player.coords)
+
+    def repaint_all(self):
+        """Repaints every map unit with its background, e.g. after restore"""
+        for y in range(0, len(self.GD.map), self.GD.size[0]):
+            self.repaint_band(y, background=True)
+        self.GD.stale = set()
+        self.GD.hidden = set()
+
+    def snapshot(self):
+        """
+        Returns the state of the game (tick, player, action map and every
+        moving object) as a compact binary snapshot, see Snapshot.py
+
+        :return: <bytes> The snapshot, restore takes it back
+        """
+        return Snapshot.encode(Snapshot.capture(self))
+
+    def restore(self, snapshot):
+        """
+        Puts the game back in the state of *snapshot*, taken from this
+        game or another one made from the same map and seed
+
+        :param snapshot: <bytes> Snapshot returned by snapshot
+        """
+        Snapshot.apply(self, Snapshot.decode(snapshot))
 
     def player_env(self, y_range, x_range):
         """
@@ -133,8 +292,8 @@ class Game(object):
             x_left = 0
             x_right = x_left + x_range * 2
         elif pos_x + x_range > len(self.GD.map[0]) - 1:
-            x_right = len(self.GD.map[0]) - 1
-            x_left = x_right - x_range * 2
+            x_right = len(self.GD.map[0])
+            x_left = max(x_right - x_range * 2, 0)
         else:
             x_left = pos_x - x_range
             x_right = x_left + x_range * 2
@@ -143,8 +302,8 @@ class Game(object):
             y_up = 0
             y_down = y_up + y_range * 2
         elif pos_y + y_range > len(self.GD.map) - 1:
-            y_down = len(self.GD.map) - 1
-            y_up = y_down - y_range * 2
+            y_down = len(self.GD.map)
+            y_up = max(y_down - y_range * 2, 0)
         else:
             y_up = pos_y - y_range
             y_down = y_up + y_range * 2
@@ -153,16 +312,14 @@ class Game(object):
 
     def action(self):
         """
-        Checks for input from user and acts accordingly
+        Checks for input from user and acts accordingly, handling every
+        key pressed since the last call in order
 
         :return: <bool> Returns True if there is an action, else False
         """
-        if self.input[0] == None:
-            return False
-        else:
-            input = self.input[0]
-            self.input[0] = None
+        acted = False
 
+        for input in self.keys.drain():
             if input == 'x':
                 self.kill()
             elif input == 'w':
@@ -174,119 +331,216 @@ class Game(object):
             elif input == 'd':
                 move = "Right"
             else:
-                return False
+                continue
 
             self.player.update(move)
-            return True
+            acted = True
+
+        return acted
+
+    def player_moved(self):
+        """Called after the player moved, nothing to do in a normal game"""
+        return None
+
+    def picture(self, kind, tick=None):
+        """
+        Animation clock: returns the picture all objects of type *kind*
+        show in this tick (or in *tick*), worked out once per tick and type
+        from its *frames*. Pictures only depend on the tick, not on how the
+        objects moved.
+        """
+        if tick is not None:
+            num, times = kind.frames
+            return tick // times % num
+
+        shown = self.pictures.get(kind)
+        if shown is None or shown[0] != self.tick:
+            num, times = kind.frames
+            shown = self.pictures[kind] = (self.tick, self.tick // times % num)
+        return shown[1]
+
+    def last_move(self, mover):
+        """
+        Returns the tick *mover* last moved in, as told by its cycle count,
+        0 if it hasn't moved yet. Only right between two ticks, e.g. for
+        painting it again with the picture it moved with.
+        """
+        return max(self.tick - mover.cycle_count, 0)
 
     def update_map(self):
         """Updates all objects in map"""
-        for log in self.logs:
-            log.update()
+        if self.profiler is not None:
+            self.update_map_timed()
+        else:
+            for mover in self.movers:
+                mover.update()
+        self.tick += 1
 
-        for car in self.cars:
-            car.update()
+    def update_map_timed(self):
+        """
+        Same as update_map, recording the time spent per object type and,
+        as the blit phase, the part of it spent painting and erasing
+        sprites on the Display Map
+        """
+        clock = self.profiler.clock
+        if self.blit is None:
+            self.time_blits()
+        self.blit = 0.0
+        spent = {}
+
+        for mover in self.movers:
+            start, blit = clock(), self.blit
+            mover.update()
+            name = "update " + mover.kind.__name__
+            spent[name] = (spent.get(name, 0) + clock() - start
+                           - (self.blit - blit))
+
+        for name, seconds in spent.items():
+            self.profiler.record(name, seconds)
+        self.profiler.record('blit', self.blit)
+
+    def time_blits(self):
+        """Has the Game Display add the time its paint and uncover take to
+        self.blit, only done when profiling
+        """
+        clock = self.profiler.clock
+
+        def timed(method):
+            def blit(*args, **kwargs):
+                start = clock()
+                method(*args, **kwargs)
+                self.blit += clock() - start
+            return blit
 
-        for snake in self.snakes:
-            snake.update()
+        self.blit = 0.0
+        self.GD.paint = timed(self.GD.paint)
+        self.GD.uncover = timed(self.GD.uncover)
 
-    def get_input(self, input):
+    def fast_forward(self, ticks):
         """
-        Thread that gets keyboard input from user
+        Advances the game *ticks* ticks at once. Objects that can't reach
+        the player, being in another map unit, jump straight to where they
+        will be. Only the ones next to the player are updated tick by tick,
+        so collisions and riding a log work as usual, and so are the ones
+        in map units where objects move at different speeds or directions:
+        where they run into each other depends on every tick.
+
+        :param ticks: <int> How many ticks to skip
+        """
+        player_y = self.player.coords[0]
+        near = [mover for y, movers in self.bands.items()
+                if y == player_y
+                or len({(i.speed, i.move) for i in movers}) > 1
+                for mover in movers]
+        stepped = set(near)
+        start = self.tick
+        try:
+            for tick in range(ticks):
+                for mover in near:
+                    mover.update()
+                self.tick += 1
+        finally:
+            # Even if the player died on the way, the rest of the map
+            # catches up to the tick it happened in
+            moved = set()
+            for mover in self.movers:
+                if mover not in stepped and mover.skip(self.tick - start):
+                    moved.add(mover.y)
+
+            for y in moved:
+                if self.GD.in_view(y):
+                    self.repaint_band(y)
+                else:
+                    self.GD.stale.add(y)
+
+    def step(self):
+        """One game tick: act on input and update the map"""
+        prof = self.profiler
+        if prof is None:
+            self.action()
+            self.update_map()
+            return None
+
+        start = prof.clock()
+        self.action()
+        prof.record('input', prof.clock() - start)
+        self.update_map()
+        prof.record('tick', prof.clock() - start)
 
-        :param input: <list> List of len(1) that both threads share
+    def main_loop(self, FPS=40, TPS=70):
         """
-        while True:
-            input[0] = getch()
-            if threading.current_thread().stopped():
-                exit()
+        The main loop of the game
 
-    def main_loop(self):
-        """The main loop of the game"""
+        :param FPS: <int> Highest number of frames per second, fewer are
+                    printed if the terminal can't keep up
+        :param TPS: <int> Ticks per second
+        """
         # Clear screen once at the beginning
-        os.system('clear')
-        # Start thread which checks for input and alternate terminal screen
-        self.thread.start()
+        self.out.clear()
+        # Put the terminal in cbreak mode for reading keys as they come
+        self.keys.start()
+        self.watch_size()
 
-        # Loop forever, printing game approx. FPS per second
-        self.FPS = 40
+        # Ticks and frames as the Pacer says
+        self.pacer = Pacer(TPS, FPS, profiler=self.profiler)
         self.frame = 1
-        tick = 0
 
         self.start = time.perf_counter()
         try:
             while True:
-                self.action()
-                self.update_map()
+                for tick in range(self.pacer.due()):
+                    self.step()
 
-                if self.timer(self.FPS):
-                    print("\033[H", end='')
+                if self.pacer.frame_due():
+                    start = self.pacer.clock()
+                    self.out.write("\033[H")
                     self.print_game()
+                    self.pacer.framed(self.pacer.clock() - start)
                     self.frame += 1
 
-                self.sleeper(tick)
-                tick += 1
+                self.pacer.wait()
+        except KeyboardInterrupt:
+            pass
         except Exception:
             traceback.print_exc()
             self.kill()
 
         self.kill()
 
-    def timer(self, FPS):
-        """
-        Game should be printed *FPS* times per second. Determines if we are
-        behind schedule and should print a frame.
-
-        :param FPS: <int> Amount of frames per second that we want
-        :return: <bool> True if it's time to print, False if not
-        """
-        frame_time = self.frame / FPS
-        elapsed_time = time.perf_counter() - self.start
-
-        return frame_time - elapsed_time < 0
-
-    def sleeper(self, tick, TPS=70):
-        """
-        Sleeps for just enough time to meet our TPS schedule
-
-        :param tick: <int> How many game ticks have elapsed
-        :param TPS: <int> Ticks per second (How often we udpate our game map)
-        """
-        correct_time = tick / TPS
-        actual_time = time.perf_counter() - self.start
-
-        # If we are ahead of time: sleep off the difference
-        if correct_time - actual_time > 0:
-            time.sleep(correct_time - actual_time)
-
     def dead(self, message= ' '):
         """
         Prints the map once more to show final death screen,
         prints final message and then kills program
         """
-        os.system('clear')
-        self.print_game()
-        print("Sorry but you died. " + message)
+        self.GD.invalidate()
+        self.out.write(CLEAR)
+        self.out.write(self.render_game())
+        self.out.write("Sorry but you died. " + message + "\n")
+        self.out.flush()
         self.kill()
 
     def kill(self):
         """
-        Waits for thread to stop properly
+        Gives the terminal its old settings back, saves the timings
+        if we profiled and exits
         """
-        print("Press any key to exit.")
-        self.thread.stop()
-        self.thread.join()
+        self.out.close()
+        self.keys.close()
+        if self.profiler is not None:
+            self.profiler.export()
         exit()
 
 
 class Player(object):
 
-    def __init__(self, symbol, Game):
+    def __init__(self, symbol, Game, position=None):
         self.sym = symbol
         self.GD = Game.GD
         self.act_map = self.GD.act_map
         self.game = Game
-        self.coords = self.GD.trans_coords(self.find(self.sym), "act_map")
+        if position is None:
+            position = self.find(self.sym)
+        self.coords = list(self.GD.to_disp(position))
         self.replace = ' '
 
     def find(self, symbol):
@@ -312,6 +566,8 @@ class Player(object):
 
             self.check_position([pos_y, pos_x])
 
+        self.game.player_moved()
+
     def check_position(self, position):
         """
         Checks if move is possible and what should happen
@@ -321,8 +577,10 @@ class Player(object):
         # Check if player is at either edge of map, if so do nothing
         if position[1] < 0 or position[1] >= len(self.GD.map[0]):
             return True
+        if position[0] < 0 or position[0] >= len(self.GD.map):
+            return True
 
-        pos_y, pos_x = self.GD.trans_coords(position, "disp_map")
+        pos_y, pos_x = self.GD.to_act(position)
         symbol = self.act_map[pos_y][pos_x]
 
         if symbol in [' ', 'o', '_']:
@@ -345,90 +603,183 @@ class Player(object):
         :param position: <list> Current position in form of [y, x] coords
         :param new_position: <list> Display map target coords in form of [y, x]
         """
-        y, x = self.GD.trans_coords(position, "disp_map")
-        y_new, x_new = self.GD.trans_coords(new_position, "disp_map")
+        y, x = self.GD.to_act(position)
+        y_new, x_new = self.GD.to_act(new_position)
         symbol = self.act_map[y][x]
 
         # Update action map replacing old spot with previous symbol
         self.act_map[y][x] = self.replace
         self.act_map[y_new][x_new] = symbol
 
-        # Update the Game Display with normal coords
-        self.GD.display(self.replace, position)
+        # Update the Game Display with normal coords: take the player off,
+        # showing the background again or the object it stood on
+        self.GD.erase(position)
+        if any(self.replace == i[0] for i in ENTITIES):
+            self.GD.display(self.replace, position)
         self.GD.display(symbol, new_position)
 
         self.coords = new_position[:]
 
+# Every type of moving object: its symbol in the map, how many symbols in a
+# row make up one object, its class and the Game attribute listing them.
+# Objects are created and updated in this order.
+ENTITIES = []
+
+
+def register(symbol, length, group):
+    """
+    Class decorator adding a Thing subclass to ENTITIES, so Game finds its
+    objects in the map
+
+    :param symbol: <char> Symbol of the object in the map
+    :param length: <int> How many symbols one object has in the map
+    :param group: <str> Game attribute listing all objects of the class
+    """
+    def add(Object):
+        Object.symbol = symbol
+        ENTITIES.append((symbol, length, Object, group))
+        return Object
+    return add
+
+
 class Thing(object):
+    # Coords, direction, speed and cycles live in Game.entities under id
+    __slots__ = ('id', 'store', 'GD', 'game', 'act_map', 'replace')
+
+    # Symbol of the Thing in the map, set by register
+    symbol = None
+    # Whether the player moves along when standing on this Thing
+    carrier = False
+    # How many pictures the Thing has and for how many ticks each is shown,
+    # all Things of a type show the same one (see Game.picture)
+    frames = (1, 1)
 
     def __init__(self, coords, direction, Game):
         self.GD = Game.GD
         self.game = Game
-        self.coords = [self.GD.trans_coords(i, "act_map") for i in coords]
+        self.store = Game.entities
+        coords = [self.GD.to_disp(i) for i in coords]
         self.act_map = self.GD.act_map
 
         # Specifies the default symbol with which to replace when moving
         self.replace = ' '
 
         if direction == 'R':
-            self.move = +1
+            move = +1
             # reverse coords so that head is the first item
-            self.coords.reverse()
+            coords.reverse()
         else:
-            self.move = -1
+            move = -1
 
         # Random speed between one update every cycle, every 2nd or 3rd cycle
-        self.speed = random.randint(2, 3)
-        self.cycle_count = 1
+        self.id = self.store.add(coords, move, random.randint(2, 3))
+
+        # Register each piece in the cell index of the action map
+        for i in range(len(self.coords)):
+            self.GD.add_piece(self.GD.to_act(self.coords[i]), (self, i))
+
+    @property
+    def kind(self):
+        """Type of the Thing, Lanes have the same attribute"""
+        return type(self)
+
+    @property
+    def y(self):
+        """Top line of the map unit the Thing moves in"""
+        return self.store.y[self.store.first[self.id]]
+
+    @property
+    def coords(self):
+        """View of the display map [y, x] coords of each piece"""
+        return self.store.pieces(self.id)
+
+    @property
+    def move(self):
+        return self.store.move[self.id]
+
+    @property
+    def speed(self):
+        return self.store.speed[self.id]
+
+    @speed.setter
+    def speed(self, speed):
+        self.store.speed[self.id] = speed
+
+    @property
+    def cycle_count(self):
+        return self.store.cycle[self.id]
 
     def update(self):
-        """Update Thing every *speed* cycle"""
+        """
+        Update Thing every *speed* cycle
+
+        :return: <bool> True if the Thing moved, else None
+        """
+        store, id = self.store, self.id
         # Only continues if cycle_count is equal to self.speed
-        if self.cycle_count == self.speed:
-            self.cycle_count = 1
+        if store.cycle[id] == store.speed[id]:
+            store.cycle[id] = 1
         else:
-            self.cycle_count += 1
+            store.cycle[id] += 1
             return None
 
         # Update each separate chunk of Thing
-        for i in range(len(self.coords)):
+        for i in range(store.length[id]):
             self.update_piece(i)
 
+        self.check_player()
+        return True
+
+    def check_player(self):
+        """Checks what happens to the player after the Thing moved,
+        nothing by default
+        """
+        pass
+
     def update_piece(self, i):
         """Moves piece one to the right or left
         and displays it on the map
         """
-        old = self.coords[i][:]
-        new = self.coords[i]
-
-        new[1] += self.move
+        store, GD = self.store, self.GD
+        p = store.first[self.id] + i
+        y, x = store.y[p], store.x[p]
+        new_x = x + store.move[self.id]
 
         # If over the board to the right or left
-        if new[1] >= len(self.GD.map[0]):
-            new[1] = 0
-        elif new[1] < 0:
-            new[1] = len(self.GD.map[0]) - 1
-
-        # Transform display map coords to action map coords
-        pos = self.GD.trans_coords(old, "disp_map")
-        new_pos = self.GD.trans_coords(new, "disp_map")
-
-        # Get the correct symbol from act_map and change display map
-        symbol = self.act_map[pos[0]][pos[1]]
-        self.change_display(symbol, old, new)
+        width = len(GD.map[0])
+        if new_x >= width:
+            new_x = 0
+        elif new_x < 0:
+            new_x = width - 1
+        store.x[p] = new_x
+        old, new = (y, x), (y, new_x)
+
+        # Look up the action map coords of both, the line stays the same
+        act_y = GD._act_y[y]
+        pos, new_pos = (act_y, GD._act_x[x]), (act_y, GD._act_x[new_x])
+
+        # Get the correct symbol from act_map and change display map,
+        # off screen the map unit is repainted once it is shown again
+        if GD.in_view(y, x) or GD.in_view(y, new_x):
+            symbol = self.act_map[act_y][pos[1]]
+            self.change_display(symbol, old, new)
+        elif GD.in_view(y):
+            GD.hidden.add(y)
+        else:
+            GD.stale.add(y)
 
         # If pos and new_pos are different, update action map
         if pos != new_pos:
-            self.move_symbol(pos, new_pos)
+            self.move_symbol(pos, new_pos, i)
 
     def change_display(self, symbol, old, new):
-        """Changes display at old and new positions, using symbol at new"""
-        self.GD.display(self.replace, old)
+        """Takes the Thing off the display at old and paints symbol at new"""
+        self.GD.erase(old)
         self.GD.display(symbol, new)
 
-    def move_symbol(self, pos, new_pos):
+    def move_symbol(self, pos, new_pos, i):
         """Moves symbol in action map to a new position and
-        replaces old with replace symbol
+        replaces old with replace symbol, piece *i* moves in the cell index
         """
         y, x = pos
         y_new, x_new = new_pos
@@ -436,15 +787,66 @@ class Thing(object):
 
         self.GD.act_map[y][x] = self.replace
         self.GD.act_map[y_new][x_new] = symbol
+        self.GD.move_piece(pos, new_pos, (self, i))
+
+    def near_player(self):
+        """
+        Looks up which pieces of this Thing are in the player's cell or
+        the cells left and right of it
+
+        :return: <list> Indexes of those pieces in self.coords
+        """
+        pieces = self.GD.pieces_near(self.game.player.coords)
+        return [i for thing, i in pieces if thing is self]
+
+    def hits_player(self):
+        """Checks if any piece of this Thing collides with the player"""
+        play_coords = self.game.player.coords
+        for i in self.near_player():
+            if self.GD.check_collision(self.coords[i], play_coords):
+                return True
+        return False
+
+    def repaint(self):
+        """Paints every piece again with the picture it last moved with,
+        the player standing on it is painted by Game.repaint_band
+        """
+        frame = self.game.picture(self.kind, self.game.last_move(self))
+        for coords in self.coords:
+            self.GD.display(self.symbol, coords, frame)
 
-    def cycle_generator(self, num, times):
-        """Yields an infinite cycle from 0 to num - 1, each number *times*"""
-        while True:
-            for i in range(num):
-                for j in range(times):
-                    yield i
+    def skip(self, ticks):
+        """
+        Advances the Thing as if update was called *ticks* times, in one
+        step and without player checks. The coords, action map and cell
+        index are moved, the map has to be repainted afterwards.
+
+        :return: <bool> True if the Thing moved
+        """
+        old = [self.GD.to_act(i) for i in self.coords]
+        if not self.store.skip(self.id, ticks, len(self.GD.map[0])):
+            return False
 
+        symbols = [self.act_map[y][x] for y, x in old]
+        new = [self.GD.to_act(i) for i in self.coords]
+        for i in range(len(new)):
+            if new[i] != old[i]:
+                self.GD.move_piece(old[i], new[i], (self, i))
+
+        # Pieces jump past each other, so only clear cells that no piece
+        # (of this or another Thing) is left in
+        for y, x in old:
+            if (y, x) not in self.GD.cells:
+                self.act_map[y][x] = self.replace
+        for i, (y, x) in enumerate(new):
+            self.act_map[y][x] = symbols[i]
+        return True
+
+@register('o', 3, 'logs')
 class Log(Thing):
+    __slots__ = ()
+
+    carrier = True
 
     def __init__(self, coords, direction, Game):
         super(Log, self).__init__(coords, direction, Game)
@@ -452,25 +854,31 @@ class Log(Thing):
         # Override Thing replace symbol with '^' water symbol
         self.replace = '^'
 
-    def update_piece(self, i):
-        """Overrides Thing method and adds a player check for each piece"""
-        super(Log, self).update_piece(i)
-
-        # Logs can have players on them so we additionally check for player
+    def check_player(self):
+        """Overrides Thing method, moving the player along if it's on us"""
+        # Logs can have players on them so we additionally check for player,
+        # only the pieces around the player can be carrying it
         player = self.game.player
-        y, x = self.GD.trans_coords(self.coords[i], "disp_map")
 
-        if self.act_map[y][x] == player.sym:
-            # Check if player is at the edge at new coords
-            if self.coords[i][1] >= len(self.GD.map[0]) - self.GD.size[1]:
-                self.game.dead()
-            elif self.coords[i][1] == 0:
-                self.game.dead()
+        for i in self.near_player():
+            y, x = self.GD.to_act(self.coords[i])
+
+            if self.act_map[y][x] == player.sym:
+                # Check if player is at the edge at new coords
+                if self.coords[i][1] >= len(self.GD.map[0]) - self.GD.size[1]:
+                    self.game.dead()
+                elif self.coords[i][1] == 0:
+                    self.game.dead()
 
-            # If not dead update players coords
-            player.coords = self.coords[i][:]
+                # If not dead update players coords
+                player.coords = self.coords[i][:]
 
+@register('u', 1, 'cars')
 class Car(Thing):
+    __slots__ = ()
+
+    # Cycle through three pictures, 18 ticks (six moves) each
+    frames = (3, 18)
 
     def __init__(self, coords, direction, Game):
         super(Car, self).__init__(coords, direction, Game)
@@ -479,70 +887,62 @@ class Car(Thing):
         self.replace = '_'
         # Override Thing speed with set speed
         self.speed = 3
-        # Initialize generator object in order to cycle pictures of Car
-        self.cycle = self.cycle_generator(3, 6)
 
-    def update_piece(self, i):
+    def check_player(self):
         """
         Overrides Thing method, adding a check for player collision
         """
-        super(Car, self).update_piece(i)
-
-        player = self.game.player
-        # Get display map coords from player and car
-        car_coords = self.coords[i]
-        play_coords = player.coords
-
-        # Check if their coords collide
-        if self.GD.check_collision(car_coords, play_coords):
+        # Check if any of our pieces near the player collides with it
+        if self.hits_player():
+            play_coords = self.game.player.coords
             self.GD.display("car_death", play_coords)
             self.game.dead("You got hit by a car..SPLAT!")
 
     def change_display(self, symbol, old, new):
-        """Overrides Thing method and adds picture cycle"""
-        self.GD.display(self.replace, old)
-        self.GD.display(symbol, new, next(self.cycle))
+        """Overrides Thing method, showing the picture of this tick"""
+        self.GD.erase(old)
+        self.GD.display(symbol, new, self.game.picture(self.kind))
 
+@register('p', 1, 'cars')
 class SpeedCar(Car):
+    __slots__ = ()
+
+    # Override Car frames, this car has only one picture
+    frames = (1, 1)
 
     def __init__(self, coords, direction, Game):
         super(SpeedCar, self).__init__(coords, direction, Game)
 
         # Make this car go fast
         self.speed = 1
-        # Override Car cycle, this car has only one picture
-        self.cycle = self.cycle_generator(1, 1)
 
+@register('s', 3, 'snakes')
 class Snake(Thing):
+    __slots__ = ()
+
+    # Cycle through two pictures, 6 ticks (two moves) each
+    frames = (2, 6)
 
     def __init__(self, coords, direction, Game):
         super(Snake, self).__init__(coords, direction, Game)
 
         # Override Thing speed with set speed
         self.speed = 3
-        # Initialize generator object in order to cycle pictures of Car
-        self.cycle = self.cycle_generator(2, 6)
 
-    def update_piece(self, i):
+    def check_player(self):
         """
         Overrides Thing method, adding a check for player collision
         """
-        super(Snake, self).update_piece(i)
-
-        player = self.game.player
-        # Get display map coords from player and car
-        car_coords = self.coords[i]
-        play_coords = player.coords
-
-        # Check if their coords collide
-        if self.GD.check_collision(car_coords, play_coords):
+        # Check if any of our pieces near the player collides with it
+        if self.hits_player():
+            play_coords = self.game.player.coords
             self.GD.display("snake_death", play_coords)
             self.game.dead("You got eaten by a snake..SPLAT!")
 
     def change_display(self, symbol, old, new):
-        """Overrides Thing method and adds picture cycle"""
-        self.GD.display(self.replace, old)
-        self.GD.display(symbol, new, next(self.cycle))
+        """Overrides Thing method, showing the picture of this tick"""
+        self.GD.erase(old)
+        self.GD.display(symbol, new, self.game.picture(self.kind))
 
 
 
@@ -642,5 +1042,33 @@ symbols = {
 
 
 if __name__ == "__main__":
-    game = Game(maze2, symbols)
+    parser = argparse.ArgumentParser(description="Frogger in the terminal")
+    parser.add_argument('--profile', action='store_true',
+                        help="show loop timings below the game")
+    parser.add_argument('--stats', metavar='FILE',
+                        help="append loop timings to FILE as JSON lines")
+    parser.add_argument('--level', metavar='FILE',
+                        help="play a level compiled with Level.py")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed for the speeds of the objects")
+    parser.add_argument('--record', metavar='FILE',
+                        help="record the game to FILE, check it with "
+                             "Replay.py")
+    parser.add_argument('--cast', metavar='FILE',
+                        help="record what is shown to FILE, play it with "
+                             "asciinema play FILE")
+    args = parser.parse_args()
+
+    seed = random.randrange(2 ** 32) if args.seed is None else args.seed
+    random.seed(seed)
+    level = Level(args.level, symbols) if args.level else None
+    game = Game(maze2, symbols, level=level)
+    if args.record:
+        from Replay import Recorder
+        game.keys = Recorder(game, args.record, seed,
+                             level.map if level else maze2)
+    if args.cast:
+        game.out = CastWriter(args.cast, terminal=game.out)
+    if args.profile or args.stats:
+        game.profiler = Profiler(overlay=args.profile, path=args.stats)
     game.main_loop()
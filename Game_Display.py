@@ -1,28 +1,261 @@
+class Sprite(object):
+    """
+    One picture of a symbol, compiled once by GD. Holds the rows as a tuple
+    of strings and, for every column k, the rows split in two halves after
+    k columns, which is what display needs when the picture wraps around
+    the right edge of the map.
+    """
+    __slots__ = ('rows', 'height', 'width', 'halves')
+
+    def __init__(self, rows):
+        self.rows = tuple(rows)
+        self.height = len(self.rows)
+        self.width = len(self.rows[0])
+        self.halves = [(tuple(i[:k] for i in self.rows),
+                        tuple(i[k:] for i in self.rows))
+                       for k in range(self.width + 1)]
+
+
 class GD(object):
 
-    def __init__(self, map, symbols):
+    # Compiled pictures by display class and symbols table, see compile_all
+    _compiled = {}
+    # Finished background layers by display class, symbols table and
+    # Symbol Map, see share_background
+    _backgrounds = {}
+    # Attributes compile fills
+    tables = ('_sprites',)
+
+    def __init__(self, map, symbols, display=None):
+        """
+        :param map: <list> A list of strings containing simple map
+        :param symbols: <dict> Contains all the graphics for our symbols
+        :param display: <buffer> Display map of *map* already transformed,
+                        as UTF-32 code points (see Level)
+        """
         self._symbols = symbols
 
         # Size of one map unit in y, x length
-        empty_block = self.get(' ')
+        empty_block = symbols[' '][0]
         self.size = (len(empty_block), len(empty_block[0]))
 
-        self.map = self.trans_map(map)
+        self.compile_all(symbols)
+
+        if display is None:
+            self.map = self.trans_map(map)
+        else:
+            self.map = self.load_map(display, len(map[0]) * self.size[1])
         self.act_map = [list(i) for i in map]
 
+        # Background layer: the Display Map without moving objects and
+        # the player, painted in with ground and never changed after.
+        # self.map holds it with the sprites on top, erase takes a sprite
+        # off by copying the background back. Made from self.map when it
+        # is first painted into, unless one is shared (see
+        # share_background), which is copied first.
+        self.background = None
+        self._shared = False
+
+        # act_map line and column nearest to every display map line and
+        # column, see to_act
+        self._act_y, self._act_x = self.act_tables(len(map), len(map[0]))
+
+        # Moving pieces in each act_map cell, as (Thing, piece index)
+        self.cells = {}
+
+        # How far the rows of each scrolled map unit (keyed by its top
+        # line) are shifted to the right when shown, see scroll
+        self.offsets = {}
+
+        # Lines and columns shown last, None shows everything. Paintings
+        # of moving objects on units outside of it are skipped and the
+        # units remembered as stale until they are shown again. Units
+        # shown, but with paintings skipped left or right of the view, are
+        # hidden, and repainted once other columns are shown.
+        self.view = None
+        self.stale = set()
+        self.hidden = set()
+
+        # Rows of the last frame written to the terminal and the part of
+        # the map they show, None forces a full repaint on the next
+        # render. Only the map units painted since (by top line) are
+        # looked at again for the next frame.
+        self._frame = None
+        self._shown = None
+        self.dirty = set()
+
+    def compile_all(self, symbols):
+        """
+        Compiles every picture of every symbol. This is done once per
+        symbols table and display class, games drawn with the same table
+        share the compiled pictures, so the table must not change after.
+        """
+        key = (type(self), id(symbols))
+        cached = self._compiled.get(key)
+        # The table is kept with the pictures, so its id can't be reused
+        if cached is None or cached[0] is not symbols:
+            self._sprites = {}
+            for symbol, pictures in symbols.items():
+                for symbol_num, rows in enumerate(pictures):
+                    self.compile(symbol, symbol_num, rows)
+            cached = (symbols, {i: getattr(self, i) for i in self.tables})
+            self._compiled[key] = cached
+
+        for name, table in cached[1].items():
+            setattr(self, name, table)
+
+    def compile(self, symbol, symbol_num, rows):
+        """Checks that a picture has the size of one map unit and stores
+        it as a Sprite
+        """
+        height, width = self.size
+        if len(rows) != height or any(len(i) != width for i in rows):
+            raise ValueError("Picture {} of symbol {!r} is not {}x{}".format(
+                symbol_num, symbol, height, width))
+
+        self._sprites[(symbol, symbol_num)] = Sprite(rows)
+
+    def sprite(self, symbol, symbol_num=0):
+        """Returns the compiled Sprite of a symbol"""
+        return self._sprites[(symbol, symbol_num)]
+
     def get(self, symbol, symbol_num=0):
-        """Returns a copy of the transformed symbol"""
-        return self._symbols[symbol][symbol_num][:]
+        """Returns the rows of the transformed symbol as a tuple"""
+        return self._sprites[(symbol, symbol_num)].rows
 
-    def print_map(self, y_range, x_range):
-        new_map = [i[x_range[0]:x_range[1]]
-                    for i in self.map[y_range[0]: y_range[1]]]
-        for i in new_map:
-            print(''.join(i))
+    def render(self, y_range, x_range):
+        """
+        Returns what has to be written to the terminal to show the part of
+        the Display Map in *y_range* and *x_range*. Only the cells that
+        changed since the last frame are written, each run of changed cells
+        after a cursor move. Leaves the cursor on the line below the map.
+        """
+        view = (tuple(y_range), tuple(x_range))
+        last = self._frame
+        out = []
+
+        if last is None or view != self._shown:
+            frame = self.rows(y_range, x_range)
+            lines = range(len(frame))
+            # Different frame shape (or none yet): repaint everything
+            if last is None or len(last) != len(frame):
+                out.append("\033[H\033[2J")
+                last = [''] * len(frame)
+        else:
+            # Same part of the map: only painted lines can have changed
+            frame = list(last)
+            top, height = y_range[0], self.size[0]
+            lines = sorted(i - top for y in self.dirty
+                           for i in range(y, y + height)
+                           if top <= i < top + len(frame))
+            for y in lines:
+                frame[y] = self.rows([top + y, top + y + 1], x_range)[0]
+
+        for y in lines:
+            for x, run in self.diff_row(last[y], frame[y]):
+                out.append("\033[{};{}H{}".format(y + 1, x + 1, run))
+
+        out.append("\033[{};1H".format(len(frame) + 1))
+        self._frame = frame
+        self._shown = view
+        self.dirty = set()
+        return ''.join(out)
+
+    def rows(self, y_range, x_range):
+        """Returns the part of the Display Map in *y_range* and *x_range*
+        as a list of strings, with scrolled rows shifted into place
+        """
+        width = len(self.map[0])
+        x_left, x_right = x_range[0], min(x_range[1], width)
+        rows = []
+
+        for y in range(y_range[0], min(y_range[1], len(self.map))):
+            row = self.map[y]
+            shift = self.offsets.get(y - y % self.size[0])
+
+            if shift:
+                start = (x_left - shift) % width
+                end = start + x_right - x_left
+                rows.append(''.join(row[start:end] + row[:end - width]
+                                    if end > width else row[start:end]))
+            else:
+                rows.append(''.join(row[x_left:x_right]))
+        return rows
+
+    def diff_row(self, old, new, gap=8):
+        """
+        Compares two rows and returns a list of (x, run) tuples, where
+        *run* is the new text starting at position x. Unchanged stretches
+        shorter than *gap* are merged into the surrounding runs since
+        rewriting them is cheaper than another cursor move.
+        """
+        if old == new:
+            return []
+        if len(old) != len(new):
+            return [(0, new)] if new else []
+
+        runs = []
+        start = end = None
+        for x in range(len(new)):
+            if old[x] != new[x]:
+                if start is None:
+                    start = x
+                elif x - end > gap:
+                    runs.append((start, new[start:end]))
+                    start = x
+                end = x + 1
+
+        if start is not None:
+            runs.append((start, new[start:end]))
+        return runs
+
+    def invalidate(self):
+        """Forgets the last frame so the next render repaints it all"""
+        self._frame = None
 
     def update(self, symbol_map):
         """Updates the Display Map using the Symbol Map"""
         self.map = self.trans_map(symbol_map)
+        self.background = self.copy_map(self.map)
+        self._shared = False
+        self.offsets = {}
+        self.stale = set()
+        self.hidden = set()
+        self.dirty.update(range(0, len(self.map), self.size[0]))
+
+    def set_view(self, y_range, x_range):
+        """
+        Remembers the part of the map that is shown
+
+        :return: <list> Top lines of the stale map units that are now
+                 in view and have to be repainted
+        """
+        columns = self.view is None or tuple(self.view[1]) != tuple(x_range)
+        self.view = (y_range, x_range)
+        shown = {y for y in self.stale if self.in_view(y)}
+        self.stale.difference_update(shown)
+        if columns:
+            shown.update(y for y in self.hidden if self.in_view(y))
+            self.hidden.difference_update(shown)
+        return sorted(shown)
+
+    def in_view(self, y, x=None):
+        """
+        Checks if the map unit with top line *y* is (partly) shown, or if
+        *x* is given, the one map unit wide part of it from column x on,
+        wrapping around the right edge
+        """
+        if self.view is None:
+            return True
+        (y_up, y_down), (x_left, x_right) = self.view
+        if y + self.size[0] <= y_up or y >= y_down:
+            return False
+        if x is None:
+            return True
+
+        width = len(self.map[y])
+        return ((x - x_left) % width < x_right - x_left
+                or (x_left - x) % width < self.size[1])
 
     def trans_map(self, map):
         """Takes each line and transforms it, returning a new map"""
@@ -34,12 +267,57 @@ class GD(object):
 
         return [list(i) for i in new_map]
 
+    def copy_map(self, map):
+        """Returns a copy of the Display Map *map*, e.g. for a layer"""
+        return [list(i) for i in map]
+
+    def load_map(self, display, width):
+        """Turns a transformed map of UTF-32 code points, *width* per row,
+        into the Display Map
+        """
+        chars = bytes(display).decode('utf-32-le')
+        return [list(chars[i:i + width]) for i in range(0, len(chars), width)]
+
+    def shift(self, line):
+        """
+        Moves the whole map down by one map unit: the bottom line of the
+        Symbol Map falls off and *line* comes in at the top. Offsets, stale
+        and hidden units and the cell index move along, pieces in the
+        bottom line are dropped from the index.
+
+        :param line: <str> New top line of the Symbol Map
+        """
+        height = self.size[0]
+        del self.act_map[-1]
+        self.act_map.insert(0, list(line))
+        self.insert_rows(self.trans_line(line))
+        self.dirty.update(range(0, len(self.map), height))
+
+        bottom = len(self.act_map)
+        self.cells = {(y + 1, x): pieces for (y, x), pieces
+                      in self.cells.items() if y + 1 < bottom}
+        self.offsets = {y + height: step for y, step in self.offsets.items()
+                        if y + height < bottom * height}
+        self.stale = {y + height for y in self.stale
+                      if y + height < bottom * height}
+        self.hidden = {y + height for y in self.hidden
+                       if y + height < bottom * height}
+
+    def insert_rows(self, rows):
+        """Puts *rows* on top of the Display Map and the background, the
+        same number of rows fall off at the bottom
+        """
+        self.own_background()
+        for layer in (self.map, self.background):
+            del layer[-len(rows):]
+            layer[0:0] = [list(i) for i in rows]
+
     def trans_line(self, line):
         """Takes a line and transforms each symbol, the line may turn
         into multiple lines
         """
         #Start the new lines, one symbol turns into multiple lines
-        new_lines = self.get(line[0])
+        new_lines = list(self.get(line[0]))
 
         #For each symbol, retrieve its map and add each line to the
         #corresponding line in new_lines
@@ -51,40 +329,167 @@ class GD(object):
 
         return new_lines
 
-    def trans_coords(self, coords, map):
-        """Takes coords from *map* and returns the top left corner
-        coords of the corresponding field from the other map as a list
+    def act_tables(self, height, width):
         """
-        y, x = coords
-        y_len, x_len = self.size
+        Works out the act_map line and column of the field nearest to each
+        display map line and column of a *height* x *width* Symbol Map,
+        nearest meaning the next one if more than half way there. Columns
+        past the last field belong to the first one again, the map wraps.
 
-        if map == "disp_map":
-            # Get the nearest number, gets next number if more than half
-            y_new = (y + y_len // 2) // y_len
-            x_new = (x + x_len // 2) // x_len
-            # Extra case at end of map, nearest field is 0 again
-            if x_new >= len(self.act_map[y_new]):
-                x_new = 0
+        :return: <tuple> Tuples of act_map lines and columns
+        """
+        y_len, x_len = self.size
+        act_y = tuple((y + y_len // 2) // y_len
+                      for y in range(height * y_len))
+        act_x = tuple((x + x_len // 2) // x_len % width
+                      for x in range(width * x_len))
+        return act_y, act_x
 
-            return [y_new, x_new]
+    def to_act(self, coords):
+        """Returns the act_map (y, x) of the field nearest to display map
+        *coords* [y, x]
+        """
+        return self._act_y[coords[0]], self._act_x[coords[1]]
 
-        elif map == "act_map":
-            return [y * y_len, x * x_len]
+    def to_disp(self, cell):
+        """Returns the display map (y, x) of the top left corner of act_map
+        *cell* [y, x]
+        """
+        return cell[0] * self.size[0], cell[1] * self.size[1]
 
     def display(self, symbol, coords, symbol_num=0):
         """Paints *symbol* on map in position *coords*"""
-        pic = self.get(symbol, symbol_num)
         # Define starting point: line(y) and pos(x) in line
         y, x = coords
+        shift = self.offsets.get(y)
+        if shift:
+            x = (x - shift) % len(self.map[y])
+
+        self.paint(self._sprites[(symbol, symbol_num)], y, x)
+        self.dirty.add(y)
+
+    def erase(self, coords):
+        """Takes the sprite at *coords* off the map, showing the
+        background under it again
+        """
+        y, x = coords
+        shift = self.offsets.get(y)
+        if shift:
+            x = (x - shift) % len(self.map[y])
+
+        self.uncover(y, x, self.size[1])
+        self.dirty.add(y)
 
-        for i in range(len(pic)):
-            for j in range(len(pic[0])):
-                x_index = x + j
-                # If pixel goes over edge on x axis: wrap it around
-                if x + j >= len(self.map[y + i]):
-                    x_index = (x + j) % len(self.map[y + i])
+    def erase_unit(self, y):
+        """Takes every sprite off the map unit with top line *y*"""
+        self.uncover(y, 0, len(self.map[y]))
+        self.dirty.add(y)
+
+    def ground(self, cell, symbol):
+        """Paints *symbol* into the background at act_map *cell*, as
+        what is under a moving object or the player there
+        """
+        self.own_background()
+        y, x = self.to_disp(cell)
+        self.paint(self._sprites[(symbol, 0)], y, x, self.background)
+
+    def share_background(self, paint):
+        """
+        Takes the background layer finished by an earlier Game Display of
+        the same class, symbols table and Symbol Map, all games made from
+        one map or level share it. If there is none yet, *paint* is called
+        to paint what is under the objects into this one's, which is kept
+        for later ones. A shared layer is only read, see own_background.
+        """
+        key = (type(self), id(self._symbols),
+               tuple(''.join(i) for i in self.act_map))
+        cached = self._backgrounds.get(key)
+        # The table is kept with the layer, so its id can't be reused
+        if cached is None or cached[0] is not self._symbols:
+            paint()
+            cached = self._backgrounds[key] = (self._symbols, self.background)
+        self.background = cached[1]
+        self._shared = True
+
+    def own_background(self):
+        """Makes the background layer this one's own before it is painted
+        into, copying a shared one
+        """
+        if self.background is None:
+            self.background = self.copy_map(self.map)
+        elif self._shared:
+            self.background = self.copy_map(self.background)
+        self._shared = False
+
+    def paint(self, sprite, y, x, layer=None):
+        """Paints *sprite* on the Display Map rows (or those of *layer*)
+        with top left corner at line y and pos x
+        """
+        if layer is None:
+            layer = self.map
+        end = x + sprite.width
+        map_width = len(layer[y])
+
+        if end <= map_width:
+            for i, row in enumerate(sprite.rows):
+                layer[y + i][x:end] = row
+        else:
+            # Picture goes over edge on x axis: wrap the rest around
+            left, right = sprite.halves[map_width - x]
+            for i in range(sprite.height):
+                layer[y + i][x:] = left[i]
+                layer[y + i][:end - map_width] = right[i]
+
+    def uncover(self, y, x, width):
+        """Copies the background of one map unit high and *width* wide
+        with top left corner at line y and pos x onto the Display Map,
+        wrapping around the right edge
+        """
+        end = x + width
+        map_width = len(self.map[y])
+
+        for i in range(y, y + self.size[0]):
+            row, ground = self.map[i], self.background[i]
+            if end <= map_width:
+                row[x:end] = ground[x:end]
+            else:
+                row[x:] = ground[x:]
+                row[:end - map_width] = ground[:end - map_width]
+
+    def scroll(self, y, step):
+        """
+        Shifts the map unit with top line *y* by *step* columns to the
+        right, wrapping around the edge. Nothing is moved: the shift is
+        applied by rows when showing and by display when painting.
+        """
+        self.offsets[y] = (self.offsets.get(y, 0) + step) % len(self.map[y])
+        self.dirty.add(y)
+
+    def add_piece(self, cell, piece):
+        """Adds *piece* to the index at act_map *cell* [y, x]"""
+        self.cells.setdefault(tuple(cell), []).append(piece)
+
+    def move_piece(self, cell, new_cell, piece):
+        """Moves *piece* in the index from *cell* to *new_cell*"""
+        pieces = self.cells[tuple(cell)]
+        pieces.remove(piece)
+        if not pieces:
+            del self.cells[tuple(cell)]
+        self.add_piece(new_cell, piece)
+
+    def pieces_near(self, coords):
+        """
+        Returns the pieces that can collide with something at display map
+        *coords*: those in its act_map cell and the cells left and right
+        of it, wrapping around at the edge of the map
+        """
+        y, x = self.to_act(coords)
+        width = len(self.act_map[y])
 
-                self.map[y + i][x_index] = pic[i][j]
+        pieces = []
+        for i in (x - 1, x, x + 1):
+            pieces += self.cells.get((y, i % width), ())
+        return pieces
 
     def check_collision(self, obj1, obj2):
         """Checks for a collision between two objects using their coords"""
@@ -0,0 +1,221 @@
+from Entities import moves_after
+
+
+def rotate(row, step):
+    """Rotates the list *row* in place by *step* places to the right"""
+    step %= len(row)
+    if step:
+        row[:] = row[-step:] + row[:-step]
+
+
+class Lane(object):
+    """
+    All the Things in one row of the action map, moved together. Since they
+    share speed and direction and the row's background looks the same
+    everywhere, moving them all one step is the same as scrolling the whole
+    row by one column, which GD does by just changing the row's offset.
+    The Things' coords and the cell index are only brought up to date
+    (see sync) when the player is in the lane or a picture changes.
+    """
+
+    def __init__(self, things, Game):
+        self.things = things
+        self.game = Game
+        self.GD = Game.GD
+
+        first = things[0]
+        self.kind = type(first)
+        self.move = first.move
+        self.speed = first.speed
+        self.replace = first.replace
+        self.carrier = first.carrier
+        self.cycle_count = 1
+        # All pieces of the lane show the same picture of the animation
+        # clock (see Game.picture), this is the one they showed last
+        self.animated = first.frames[0] > 1
+        self.frame = 0
+
+        self.y = first.coords[0][0]
+        self.act_y = self.GD.to_act(first.coords[0])[0]
+        self.width = len(self.GD.map[0])
+
+        # Start x of every piece, how far the lane scrolled and how far
+        # the Things' coords have been moved so far
+        self.base = [[i[1] for i in thing.coords] for thing in things]
+        self.offset = 0
+        self.synced = 0
+
+    def update(self):
+        """
+        Scroll the lane every *speed* cycle
+
+        :return: <bool> True if the lane moved, else None
+        """
+        # Only continues if cycle_count is equal to self.speed
+        if self.cycle_count == self.speed:
+            self.cycle_count = 1
+        else:
+            self.cycle_count += 1
+            return None
+
+        player = self.game.player
+        here = player.coords[0] == self.y
+        # Unless we carry it, lift the player out before scrolling
+        lift = here and not self.carrier
+        if lift:
+            self.GD.erase(player.coords)
+
+        act_row = self.GD.act_map[self.act_y]
+        cell = self.cell(self.offset)
+        self.offset = (self.offset + self.move) % self.width
+        self.GD.scroll(self.y, self.move)
+
+        # Pieces crossed into the next cell: move the action map row along
+        step = self.cell(self.offset) - cell
+        if step:
+            p_y, p_x = self.GD.to_act(player.coords)
+            if lift:
+                act_row[p_x] = self.replace
+            rotate(act_row, step)
+            if lift and act_row[p_x] == self.replace:
+                act_row[p_x] = player.sym
+
+        if lift:
+            self.GD.display(player.sym, player.coords)
+
+        if self.animated:
+            self.animate()
+
+        if here:
+            # Where the scroll took the player's picture
+            moved = [self.y, (player.coords[1] + self.move) % self.width]
+            self.sync()
+            for thing in self.things:
+                thing.check_player()
+
+            # A player that just got on is snapped onto the piece carrying
+            # it: paint what it stands on over its old picture, then move
+            # the picture there as well
+            if self.carrier and player.coords != moved:
+                self.GD.display(player.replace, moved)
+                self.GD.display(player.sym, player.coords)
+        return True
+
+    def skip(self, ticks):
+        """
+        Advances the lane as if update was called *ticks* times, in one
+        step and without player checks. Pieces that changed picture are
+        not painted, the lane has to be repainted afterwards.
+
+        :return: <bool> True if the lane moved
+        """
+        moves, self.cycle_count = moves_after(self.cycle_count, self.speed,
+                                              ticks)
+        if not moves:
+            return False
+
+        cell = self.cell(self.offset)
+        step = self.move * moves
+        self.offset = (self.offset + step) % self.width
+        self.GD.scroll(self.y, step)
+        rotate(self.GD.act_map[self.act_y], self.cell(self.offset) - cell)
+
+        if self.animated:
+            self.frame = self.game.picture(self.kind,
+                                           self.game.last_move(self))
+        return True
+
+    def lower(self, lines):
+        """Moves the lane *lines* display map lines down, the Things'
+        coords move with the EntityStore
+        """
+        self.y += lines
+        self.act_y += lines // self.GD.size[0]
+
+    def cell(self, offset):
+        """Returns by how many act_map cells the lane scrolled at *offset*"""
+        x_len = self.GD.size[1]
+        return (offset + x_len // 2) // x_len
+
+    def animate(self):
+        """Shows the picture of this tick, repainting the pieces if it
+        changed. Off screen the repaint waits until the lane is shown.
+        """
+        frame = self.game.picture(self.kind)
+        if frame == self.frame:
+            return None
+
+        self.frame = frame
+        if self.GD.in_view(self.y):
+            self.repaint()
+            player = self.game.player
+            if player.coords[0] == self.y:
+                self.GD.display(player.sym, player.coords)
+        else:
+            self.GD.stale.add(self.y)
+
+    def repaint(self):
+        """Paints the current picture of every piece in the lane, the
+        player standing on one is painted by Game.repaint_band
+        """
+        self.sync()
+        symbol = self.kind.symbol
+        for thing in self.things:
+            for coords in thing.coords:
+                self.GD.display(symbol, coords, self.frame)
+
+    def sync(self):
+        """Moves the Things' coords and index cells to the current offset"""
+        if self.synced == self.offset:
+            return None
+
+        for thing, base in zip(self.things, self.base):
+            for i, coords in enumerate(thing.coords):
+                pos = self.GD.to_act(coords)
+                coords[1] = (base[i] + self.offset) % self.width
+                new_pos = self.GD.to_act(coords)
+
+                if pos != new_pos:
+                    self.GD.move_piece(pos, new_pos, (thing, i))
+        self.synced = self.offset
+
+
+def build_lanes(things, Game):
+    """
+    Groups *things* into Lanes where possible
+
+    A row becomes a Lane if all its Things have the same type, speed and
+    direction and every other cell of the row is their replace symbol
+    (or the player).
+
+    :param things: <list> All Things in the order they should update
+    :param Game: <Game> The game the Things belong to
+    :return: <list> Lanes and the remaining Things, in update order
+    """
+    rows = {}
+    for thing in things:
+        rows.setdefault(thing.coords[0][0], []).append(thing)
+
+    lanes = {}
+    for y, row in rows.items():
+        first = row[0]
+        if any(type(i) is not type(first) or i.speed != first.speed
+               or i.move != first.move for i in row):
+            continue
+
+        act_row = Game.act_map[Game.GD.to_act(first.coords[0])[0]]
+        pieces = sum(len(i.coords) for i in row)
+        background = sum(i in (first.replace, Game.player.sym)
+                         for i in act_row)
+        if pieces + background == len(act_row):
+            lanes[y] = Lane(row, Game)
+
+    # Keep the update order, a Lane goes where its first Thing was
+    movers = []
+    for thing in things:
+        y = thing.coords[0][0]
+        if y not in lanes:
+            movers.append(thing)
+        elif lanes[y].things[0] is thing:
+            movers.append(lanes[y])
+    return movers
@@ -0,0 +1,182 @@
+import re
+import mmap
+import struct
+import hashlib
+import argparse
+
+from Game_Display import GD
+
+
+MAGIC = b'FRGL'
+VERSION = 1
+
+# Magic, version, digest of the symbols, act_map height and width, display
+# map height and width, number of objects and of their pieces
+HEADER = struct.Struct('<4sI16sIIIIII')
+# Symbol (code point), direction (+1 right, -1 left), number of pieces and
+# index of the first one
+ENTITY = struct.Struct('<IbB2xI')
+# act_map [y, x] of one piece
+PIECE = struct.Struct('<II')
+
+
+def scan_map(act_map, lengths, find=''):
+    """
+    Finds all objects in one pass over *act_map*. An object is *length*
+    times its symbol in one line, the direction switches every line,
+    starting with left in the first one.
+
+    :param lengths: <dict> How many symbols make up one object, by symbol
+    :param find: <str> Symbols to also find the first position of
+    :return: <tuple> (coords, direction) of each object by symbol, coords
+             being the act_map (y, x) of its pieces and direction 'R' or
+             'L', and the [y, x] of the first of each symbol in *find*
+    """
+    objects = {symbol: [] for symbol in lengths}
+    first = {}
+    # Jumps straight from one wanted symbol to the next
+    wanted = re.compile('[{}]'.format(
+        ''.join(re.escape(i) for i in set(lengths).union(find))))
+
+    for i, line in enumerate(act_map):
+        dire = 'L' if i % 2 == 0 else 'R'
+        # Pieces found so far of the next object of each symbol
+        pieces = {}
+
+        for match in wanted.finditer(''.join(line)):
+            j, symbol = match.start(), match.group()
+            if symbol in lengths:
+                coords = pieces.setdefault(symbol, [])
+                coords.append((i, j))
+                if len(coords) == lengths[symbol]:
+                    objects[symbol].append((coords, dire))
+                    del pieces[symbol]
+            elif symbol in find and symbol not in first:
+                first[symbol] = [i, j]
+
+    return objects, first
+
+
+def digest(symbols):
+    """Returns a fingerprint of the symbol graphics a level is drawn with"""
+    return hashlib.md5(repr(sorted(symbols.items())).encode()).digest()
+
+
+def compile_level(map, symbols, path, lengths):
+    """
+    Writes *map* as a compiled level file: the act_map and the display map
+    as UTF-32 code points and a table of all moving objects, so loading it
+    needs neither transforming the map nor searching it for objects.
+
+    :param map: <list> A list of strings containing simple map
+    :param symbols: <dict> Contains all the graphics for our symbols
+    :param path: <str> File to write
+    :param lengths: <dict> How many symbols make up one object, by symbol
+    """
+    display = GD(map, symbols)
+    act = ''.join(map).encode('utf-32-le')
+    disp = ''.join(''.join(i) for i in display.map).encode('utf-32-le')
+
+    entities = []
+    pieces = []
+    found = scan_map(display.act_map, lengths)[0]
+    for symbol in sorted(found):
+        for coords, dire in found[symbol]:
+            entities.append(ENTITY.pack(ord(symbol), 1 if dire == 'R' else -1,
+                                        len(coords), len(pieces)))
+            pieces += [PIECE.pack(y, x) for y, x in coords]
+
+    header = HEADER.pack(MAGIC, VERSION, digest(symbols),
+                         len(map), len(map[0]),
+                         len(display.map), len(display.map[0]),
+                         len(entities), len(pieces))
+    with open(path, 'wb') as f:
+        f.write(b''.join([header, act, disp] + entities + pieces))
+
+
+class Level(object):
+    """
+    A compiled level file. The display map is handed to GD as a buffer
+    over the file mapped into memory, which ArrayGD uses without copying.
+    Pages are copied on write, painting never changes the file.
+    """
+
+    def __init__(self, path, symbols=None):
+        """
+        :param path: <str> Level file written by compile_level
+        :param symbols: <dict> If given, checks the level was compiled
+                        with these graphics
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mm) < HEADER.size:
+            raise ValueError("{} is not a level file".format(path))
+        (magic, version, fingerprint, act_h, act_w, disp_h, disp_w,
+         n_entities, n_pieces) = HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            raise ValueError("{} is not a level file".format(path))
+        if version != VERSION:
+            raise ValueError("{} has level format version {}, not {}".format(
+                path, version, VERSION))
+        if symbols is not None and fingerprint != digest(symbols):
+            raise ValueError("{} was compiled with other symbols".format(path))
+
+        start = HEADER.size
+        end = start + act_h * act_w * 4
+        act = mm[start:end].decode('utf-32-le')
+        self.map = [act[i:i + act_w] for i in range(0, len(act), act_w)]
+
+        # Where the code points of the display map are, see view
+        self._display = (end, end + disp_h * disp_w * 4)
+        end = self._display[1]
+
+        self._objects = {}
+        entities = end
+        pieces = entities + n_entities * ENTITY.size
+        for i in range(n_entities):
+            symbol, move, length, first = ENTITY.unpack_from(
+                mm, entities + i * ENTITY.size)
+            coords = [PIECE.unpack_from(mm, pieces + j * PIECE.size)
+                      for j in range(first, first + length)]
+            self._objects.setdefault(chr(symbol), []).append(
+                (coords, 'R' if move > 0 else 'L'))
+        mm.close()
+
+    def view(self):
+        """
+        Returns the display map as a buffer of UTF-32 code points. Every
+        call maps the file again, so games sharing the Level paint into
+        pages of their own while the unchanged pages stay shared.
+        """
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        start, end = self._display
+        return memoryview(mm)[start:end]
+
+    def objects(self, symbol):
+        """Objects of *symbol* as found by scan_map, read from the file"""
+        return self._objects.get(symbol, [])
+
+
+def main(argv=None):
+    from Frogger import ENTITIES, maze2, symbols
+    from Simulation import scale_map
+
+    parser = argparse.ArgumentParser(
+        description="Compile the Frogger map into a level file")
+    parser.add_argument('path', help="level file to write")
+    parser.add_argument('-W', '--width', type=int, default=1,
+                        help="tile the map this many times horizontally")
+    parser.add_argument('-H', '--height', type=int, default=1,
+                        help="tile the map this many times vertically")
+    args = parser.parse_args(argv)
+
+    lengths = {i[0]: i[1] for i in ENTITIES}
+    compile_level(scale_map(maze2, args.width, args.height), symbols,
+                  args.path, lengths)
+
+
+if __name__ == "__main__":
+    main()
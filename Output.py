@@ -0,0 +1,161 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+
+
+# Terminals that know synchronized updates keep showing the old frame
+# until the end marker, so a frame never shows half drawn
+SYNC_BEGIN = "\033[?2026h"
+SYNC_END = "\033[?2026l"
+# Cursor home, clear screen and scrollback, what clear(1) writes
+CLEAR = "\033[H\033[2J\033[3J"
+
+
+class TerminalWriter(object):
+    """
+    Where Game writes its frames: collects everything written for a frame
+    and hands it to the terminal with one write call on flush, wrapped in
+    synchronized update escapes. Frames are put together by write on one
+    thread, but the finished text (see take) may be sent from another.
+    """
+
+    def __init__(self, stream=None, sync=True):
+        """
+        :param stream: <file> Terminal to write to, sys.stdout if None
+        :param sync: <bool> Wrap frames in synchronized update escapes
+        """
+        self.stream = sys.stdout if stream is None else stream
+        self.sync = sync
+        self.parts = []
+        try:
+            self.fd = self.stream.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            self.fd = None
+        # One frame is sent at a time, none after close
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def write(self, text):
+        """Adds *text* to the frame"""
+        self.parts.append(text)
+
+    def take(self):
+        """Returns the frame written so far, ready to send, and starts
+        the next one
+        """
+        if not self.parts:
+            return ''
+        text = ''.join(self.parts)
+        self.parts = []
+        if self.sync:
+            text = SYNC_BEGIN + text + SYNC_END
+        return text
+
+    def send(self, text):
+        """Writes the frame *text* returned by take, waiting for one that
+        is being sent from another thread
+        """
+        with self.lock:
+            if self.closed or not text:
+                return None
+
+            if self.fd is None:
+                self.stream.write(text)
+                self.stream.flush()
+                return None
+
+            # Straight to the file descriptor, a terminal may take less
+            self.stream.flush()
+            data = text.encode()
+            while data:
+                data = data[os.write(self.fd, data):]
+
+    def flush(self):
+        """Writes the frame"""
+        self.send(self.take())
+
+    def clear(self):
+        """Clears the screen, without starting a clear process"""
+        self.write(CLEAR)
+        self.flush()
+
+    def close(self):
+        """Writes what is left, frames sent after are dropped"""
+        self.flush()
+        with self.lock:
+            self.closed = True
+
+
+class NullWriter(TerminalWriter):
+    """Takes frames and throws them away, only counting them, for
+    measuring without a terminal
+    """
+
+    def __init__(self):
+        super(NullWriter, self).__init__(io.StringIO(), sync=False)
+        self.frames = 0
+        self.chars = 0
+
+    def send(self, text):
+        """Overrides TerminalWriter method, only counting the frame"""
+        if text:
+            self.frames += 1
+            self.chars += len(text)
+
+
+class CastWriter(TerminalWriter):
+    """
+    Records every frame with the time it was written, as an asciicast
+    (v2) file that asciinema can play, like the demo in the README. Frames
+    can go to a terminal as well. The file is buffered, so recording a
+    frame doesn't wait for the disk.
+    """
+
+    def __init__(self, path=None, terminal=None, size=None):
+        """
+        :param path: <str> File to record to, None keeps the frames in
+                     self.events
+        :param terminal: <TerminalWriter> Also shows the frames there
+        :param size: <tuple> Lines and columns of the recording, those of
+                     the terminal if None
+        """
+        super(CastWriter, self).__init__(io.StringIO(), sync=False)
+        self.terminal = terminal
+        self.events = []
+        self.start = time.perf_counter()
+
+        lines, columns = size or shutil.get_terminal_size()[::-1]
+        header = {'version': 2, 'width': columns, 'height': lines,
+                  'timestamp': int(time.time())}
+        self.file = None
+        if path is not None:
+            self.file = open(path, 'w', buffering=1 << 20)
+            self.file.write(json.dumps(header) + '\n')
+
+    def send(self, text):
+        """Overrides TerminalWriter method, recording the frame"""
+        with self.lock:
+            if self.closed or not text:
+                return None
+
+            event = [round(time.perf_counter() - self.start, 6), 'o', text]
+            if self.file is None:
+                self.events.append(event)
+            else:
+                self.file.write(json.dumps(event) + '\n')
+
+            if self.terminal is not None:
+                self.terminal.write(text)
+                self.terminal.flush()
+
+    def close(self):
+        """Overrides TerminalWriter method, closing the file"""
+        super(CastWriter, self).close()
+        if self.file is not None:
+            self.file.close()
+        if self.terminal is not None:
+            self.terminal.close()
@@ -0,0 +1,136 @@
+import time
+
+
+class Pacer(object):
+    """
+    Decides when a game loop ticks and prints. Ticks follow a fixed
+    schedule, but one that can't be kept isn't raced after: at most
+    *catch_up* late ticks are run at once, and after a stall of more than
+    *stall* seconds (a slow terminal, a suspended session) the schedule
+    starts over from now and the missed ticks are dropped.
+
+    Frames that are late are skipped, not made up, and none are printed
+    while ticks are still owed. The frame rate follows what the terminal
+    manages: it goes down while printing a frame takes more than its share
+    of the time between frames and back up to *FPS* once it takes less.
+    """
+
+    # Monotonic clock the schedule is kept with
+    clock = time.perf_counter
+
+    def __init__(self, TPS=70, FPS=40, min_FPS=5, catch_up=5, stall=0.25,
+                 profiler=None):
+        """
+        :param TPS: <int> Ticks per second
+        :param FPS: <int> Highest number of frames per second
+        :param min_FPS: <int> Lowest number of frames per second
+        :param catch_up: <int> Most ticks run at once to catch up
+        :param stall: <float> Seconds behind schedule after which it starts
+                      over instead of catching up
+        :param profiler: <Profiler> Gets the lag, dropped ticks and
+                         skipped frames
+        """
+        self.TPS = TPS
+        self.max_FPS = FPS
+        self.min_FPS = min_FPS
+        self.catch_up = catch_up
+        self.stall = stall
+        self.profiler = profiler
+
+        # Current frame rate and the smoothed seconds a frame takes
+        self.FPS = FPS
+        self.frame_cost = 0.0
+        # Ticks dropped by starting over and frames skipped
+        self.dropped = 0
+        self.skipped = 0
+        self.start()
+
+    def start(self):
+        """Starts the schedule from now, the first tick is due at once"""
+        now = self.clock()
+        # Time of tick 0 and ticks run since then
+        self.origin = now
+        self.tick = 0
+        self.owed = 0
+        self.next_frame = now
+        self.last_frame = now
+
+    def due(self):
+        """
+        Returns how many ticks to run now, counting them as run. That is
+        the ticks whose time has come, but no more than *catch_up*.
+
+        :return: <int> Number of ticks to run, 0 if none is due yet
+        """
+        now = self.clock()
+        if now < self.origin + self.tick / self.TPS:
+            return 0
+        behind = max(int((now - self.origin) * self.TPS) + 1 - self.tick, 1)
+
+        if behind > self.stall * self.TPS:
+            # Too far behind to catch up without a burst: start over
+            self.dropped += behind - 1
+            if self.profiler is not None:
+                self.profiler.count('dropped ticks', behind - 1)
+            self.origin = now
+            self.tick = 0
+            behind = 1
+        elif self.profiler is not None:
+            lag = now - self.origin - (self.tick / self.TPS)
+            self.profiler.record('lag', lag)
+
+        ticks = min(behind, self.catch_up)
+        self.tick += ticks
+        self.owed = behind - ticks
+        return ticks
+
+    def delay(self):
+        """Returns the seconds until the next tick is due, less than 0 if
+        it is already late
+        """
+        return self.origin + self.tick / self.TPS - self.clock()
+
+    def wait(self):
+        """Sleeps until the next tick is due"""
+        delay = self.delay()
+        if delay > 0:
+            time.sleep(delay)
+
+    def frame_due(self):
+        """
+        Checks if a frame should be printed now. Late frames are skipped,
+        and while ticks are owed frames wait, but never longer than one
+        at the lowest frame rate.
+
+        :return: <bool> True if it's time to print, False if not
+        """
+        now = self.clock()
+        if now < self.next_frame:
+            return False
+        if self.owed and now - self.last_frame < 1 / self.min_FPS:
+            return False
+
+        missed = int((now - self.next_frame) * self.FPS)
+        if missed:
+            self.skipped += missed
+            if self.profiler is not None:
+                self.profiler.count('skipped frames', missed)
+        self.next_frame += (missed + 1) / self.FPS
+        self.last_frame = now
+        return True
+
+    def framed(self, seconds):
+        """
+        Adapts the frame rate to the *seconds* the last frame took to
+        render and write, which is mostly waiting for the terminal. A
+        frame may take half the time between frames, the other half is
+        left for ticking.
+        """
+        if self.frame_cost:
+            self.frame_cost = self.frame_cost * 0.8 + seconds * 0.2
+        else:
+            self.frame_cost = seconds
+
+        if self.frame_cost > 0:
+            FPS = 0.5 / self.frame_cost
+            self.FPS = max(self.min_FPS, min(self.max_FPS, FPS))
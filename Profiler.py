@@ -0,0 +1,98 @@
+import json
+import time
+import collections
+
+
+class Histogram(object):
+    """Keeps the last *size* timings of one phase and their percentiles"""
+
+    def __init__(self, size=1000):
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, *ps):
+        """Returns the given percentiles (0-100) of the kept samples"""
+        if not self.samples:
+            return [0.0 for p in ps]
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return [ordered[int(round(p / 100 * last))] for p in ps]
+
+    def summary(self):
+        """Returns count, mean and p50/p95/p99 in milliseconds as a dict"""
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return {'count': self.count,
+                'mean_ms': self.total / self.count * 1e3 if self.count else 0,
+                'p50_ms': p50 * 1e3,
+                'p95_ms': p95 * 1e3,
+                'p99_ms': p99 * 1e3}
+
+
+class Profiler(object):
+    """
+    Collects timings of the game loop phases (input, update per object
+    type, blit, render, flush, whole tick and frame) and counters such as
+    dropped frames. Can show them below the game and write them as JSON lines.
+    """
+
+    # Low overhead monotonic clock used for every measurement
+    clock = time.perf_counter
+
+    def __init__(self, overlay=True, path=None, size=1000):
+        """
+        :param overlay: <bool> Show the timings below the game
+        :param path: <str> File to append the summary to as JSON lines
+        :param size: <int> How many recent timings each phase keeps
+        """
+        self.overlay = overlay
+        self.path = path
+        self.size = size
+        self.phases = collections.OrderedDict()
+        self.counters = collections.Counter()
+
+    def record(self, phase, seconds):
+        """Adds one timing of *phase*"""
+        if phase not in self.phases:
+            self.phases[phase] = Histogram(self.size)
+        self.phases[phase].add(seconds)
+
+    def count(self, counter, n=1):
+        """Adds *n* to *counter*, e.g. dropped frames"""
+        self.counters[counter] += n
+
+    def summary(self):
+        """Returns the summary of every phase, keyed by phase"""
+        return {phase: hist.summary() for phase, hist in self.phases.items()}
+
+    def lines(self):
+        """Returns the overlay as a list of lines"""
+        lines = ["{:<16} {:>8} {:>8} {:>8} {:>8}".format(
+            "phase (ms)", "p50", "p95", "p99", "count")]
+        for phase, hist in self.phases.items():
+            p50, p95, p99 = hist.percentiles(50, 95, 99)
+            lines.append("{:<16} {:>8.3f} {:>8.3f} {:>8.3f} {:>8}".format(
+                phase, p50 * 1e3, p95 * 1e3, p99 * 1e3, hist.count))
+        if self.counters:
+            lines.append("  ".join("{}: {}".format(name, n) for name, n
+                                   in sorted(self.counters.items())))
+        return lines
+
+    def export(self, path=None):
+        """Appends one JSON line per phase and one with the counters"""
+        path = path or self.path
+        if path is None:
+            return None
+
+        stamp = time.time()
+        with open(path, 'a') as f:
+            for phase, summary in self.summary().items():
+                summary.update(time=stamp, phase=phase)
+                f.write(json.dumps(summary) + '\n')
+            f.write(json.dumps({'time': stamp,
+                                'counters': dict(self.counters)}) + '\n')
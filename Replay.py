@@ -0,0 +1,162 @@
+import sys
+import json
+import random
+import hashlib
+import argparse
+
+from Lanes import Lane
+from getch import KeyBuffer
+
+
+VERSION = 2
+
+
+def state_hash(game):
+    """
+    Returns a hash of everything that decides how *game* goes on: the tick,
+    the player, the action map and where every object is in its move
+    cycle. What is painted is left out, it depends on what was on screen,
+    and so are pictures, they follow from the tick.
+    """
+    state = [game.tick, list(game.player.coords), game.player.replace,
+             game.act_map]
+    for mover in game.movers:
+        if isinstance(mover, Lane):
+            state.append((mover.offset, mover.speed, mover.cycle_count))
+        else:
+            state.append(([list(i) for i in mover.coords], mover.speed,
+                          mover.cycle_count))
+    return hashlib.md5(repr(state).encode()).hexdigest()
+
+
+class Recorder(object):
+    """
+    Stands in for the key reader of a Game, passing its keys on and writing
+    down at which tick they were handled, with a state hash every *every*
+    ticks. The recording is saved when the game closes its keys, which it
+    does however it ends.
+    """
+
+    def __init__(self, game, path, seed, map, lanes=True, every=1000):
+        """
+        :param game: <Game> The game to record, created right after
+                     random.seed(*seed*) from *map* or from a level, whose
+                     path is recorded as well
+        :param path: <str> File to save the recording to
+        """
+        self.game = game
+        self.reader = game.keys
+        self.path = path
+        self.every = every
+        level = game.level.path if game.level is not None else None
+        self.recording = {'version': VERSION, 'seed': seed, 'map': map,
+                          'level': level, 'lanes': lanes, 'every': every,
+                          'inputs': [], 'checkpoints': []}
+
+    def start(self):
+        self.reader.start()
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def poll(self):
+        self.reader.poll()
+
+    def drain(self):
+        """Passes on the keys of this tick, writing them down"""
+        tick = self.game.tick
+        if tick % self.every == 0:
+            self.recording['checkpoints'].append([tick,
+                                                  state_hash(self.game)])
+
+        keys = self.reader.drain()
+        if keys:
+            self.recording['inputs'].append([tick, ''.join(keys)])
+        return keys
+
+    def close(self):
+        """Closes the key reader and saves the recording"""
+        self.reader.close()
+        self.recording['ticks'] = self.game.tick
+        self.recording['final'] = state_hash(self.game)
+        with open(self.path, 'w') as f:
+            json.dump(self.recording, f)
+
+
+def replay(recording, Display=None):
+    """
+    Plays *recording* again headless and as fast as possible, stepping
+    through every tick. Fast-forwarding between recorded ticks would be
+    quicker, but ends like stepping only as long as no objects run into
+    each other.
+
+    :param recording: <dict> A recording saved by Recorder
+    :param Display: <type> Game display class, GD if None
+    :return: <tuple> The tick the replay first differed at (None if it
+             matched everywhere) and the headless game
+    """
+    from Frogger import symbols
+    from Game_Display import GD
+    from Level import Level
+    from Simulation import HeadlessGame, GameOver
+
+    if recording.get('version') != VERSION:
+        raise ValueError("Recording has version {}, not {}".format(
+            recording.get('version'), VERSION))
+
+    level = recording.get('level')
+    if level is not None:
+        level = Level(level, symbols)
+
+    random.seed(recording['seed'])
+    game = HeadlessGame(recording['map'], symbols, Display or GD,
+                        recording['lanes'], level)
+    game.keys = KeyBuffer(size=None)
+
+    inputs = {tick: keys for tick, keys in recording['inputs']}
+    checks = {tick: h for tick, h in recording['checkpoints']}
+    end = recording['ticks']
+    stops = sorted(set(inputs) | set(checks) | {end})
+
+    final = None
+    try:
+        for tick in stops:
+            while game.tick < tick:
+                game.step()
+            if tick in checks and state_hash(game) != checks[tick]:
+                return tick, game
+            if tick == end:
+                # The recorded game stopped before or died in this tick
+                final = state_hash(game)
+            game.keys.feed(inputs.get(tick, ''))
+            game.step()
+    except GameOver:
+        final = state_hash(game)
+
+    if final != recording['final']:
+        return min(game.tick, end), game
+    return None, game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that recorded games play out the same again")
+    parser.add_argument('recordings', nargs='+', metavar='FILE',
+                        help="recordings made with Frogger.py --record")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in args.recordings:
+        with open(path) as f:
+            recording = json.load(f)
+        tick, game = replay(recording)
+        if tick is None:
+            print("{}: OK, {} ticks".format(path, recording['ticks']))
+        else:
+            failed += 1
+            print("{}: differs at tick {}".format(path, tick))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
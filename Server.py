@@ -0,0 +1,256 @@
+import re
+import time
+import asyncio
+import argparse
+
+from Frogger import Game, maze2, symbols
+from Game_Display import GD
+from Array_Display import ArrayGD
+from Level import Level
+from Pacing import Pacer
+from getch import KeyBuffer
+
+
+# Telnet: we echo (WILL ECHO) and want every key right away instead of
+# whole lines (WILL SUPPRESS-GO-AHEAD)
+CHARACTER_MODE = b'\xff\xfb\x01\xff\xfb\x03'
+# Telnet commands and subnegotiations sent by the client, not keys
+TELNET_COMMAND = re.compile(rb'\xff(?:[\xfb-\xfe].|\xfa.*?\xff\xf0|.)', re.S)
+
+# Frames are skipped while more than this many bytes wait to be sent
+BACKLOG = 64 * 1024
+
+
+class SessionOver(Exception):
+    """Raised by a SessionGame when its game ends"""
+
+
+class SessionGame(Game):
+    """
+    Game played over a connection: keys come from the client and frames go
+    to it. Dying or quitting ends the session instead of the process.
+    """
+
+    def __init__(self, out, size, map, symbols, Display=GD, lanes=True,
+                 level=None):
+        """
+        :param out: <Session> Where frames are written
+        :param size: <tuple> Lines and columns of the client's terminal
+        """
+        super(SessionGame, self).__init__(map, symbols, Display, lanes, level)
+        self.keys = KeyBuffer()
+        self.out = out
+        self.size = size
+        self.start = time.perf_counter()
+        self.frame = 1
+
+    def screen_size(self):
+        """Overrides Game method, the client's terminal has a fixed size"""
+        return self.size
+
+    def dead(self, message=' '):
+        """Overrides Game method, shows the death screen to the client"""
+        self.GD.invalidate()
+        self.out.write(self.render_game())
+        self.out.write("Sorry but you died. " + message + "\n")
+        self.kill()
+
+    def kill(self):
+        """Overrides Game method, only this session ends"""
+        raise SessionOver()
+
+
+class Session(object):
+    """One client connection and its game"""
+    __slots__ = ('game', 'writer', 'owed', 'active')
+
+    def __init__(self, server, writer):
+        self.writer = writer
+        self.game = server.new_game(self)
+        # Ticks the game is behind, see tick
+        self.owed = 0
+        # When the client last pressed a key
+        self.active = time.perf_counter()
+
+    def write(self, text):
+        """Sends *text* to the client, terminals there want \\r\\n.
+        Nothing is sent once the connection is closing.
+        """
+        if self.writer.is_closing():
+            return None
+        self.writer.write(text.replace('\n', '\r\n').encode())
+
+    def flush(self):
+        """Nothing to do, the transport sends as soon as it can"""
+        return None
+
+    def feed(self, data):
+        """Hands the keys in *data* received from the client to the game"""
+        keys = TELNET_COMMAND.sub(b'', data).decode(errors='ignore')
+        if keys:
+            self.game.keys.feed(keys)
+            self.active = time.perf_counter()
+
+    def tick(self):
+        """
+        Advances the game one tick. While no key waits and nothing moves in
+        the player's line, nothing can happen to the player, so the tick
+        is only counted and made up for later in one go by catch_up.
+        """
+        game = self.game
+        if not game.keys.keys and game.player.coords[0] not in game.bands:
+            self.owed += 1
+            return None
+
+        self.catch_up()
+        game.step()
+
+    def catch_up(self):
+        """Brings the game up to date with the ticks it is behind"""
+        if self.owed:
+            owed, self.owed = self.owed, 0
+            self.game.fast_forward(owed)
+
+    def render(self):
+        """Sends the client the next frame"""
+        self.catch_up()
+        self.write(self.game.render_game())
+        self.game.frame += 1
+
+
+class Server(object):
+    """
+    Hosts many games in one process, one per TCP connection (e.g. telnet).
+    One loop ticks all sessions and another sends them their frames, idle
+    clients get fewer frames. Pictures and the background layer are made
+    once for all games and a compiled level is mapped copy-on-write for
+    each game, so unchanged pages of its display map are shared.
+    """
+
+    def __init__(self, symbols, map=maze2, level=None, Display=GD,
+                 size=(24, 80), TPS=70, FPS=20, idle=10, idle_FPS=1):
+        """
+        :param symbols: <dict> Contains all the graphics for our symbols
+        :param map: <list> A list of strings containing simple map
+        :param level: <Level> Compiled level to play instead of *map*
+        :param Display: <type> Game display class, GD or a subclass of it
+        :param size: <tuple> Lines and columns of the clients' terminals
+        :param TPS: <int> Ticks per second
+        :param FPS: <int> Frames per second
+        :param idle: <float> Seconds without a key until a client is idle
+        :param idle_FPS: <int> Frames per second sent to idle clients
+        """
+        self.symbols = symbols
+        self.map = map
+        self.level = level
+        self.Display = Display
+        self.size = size
+        self.TPS = TPS
+        self.FPS = FPS
+        self.idle = idle
+        self.idle_FPS = idle_FPS
+        self.sessions = set()
+
+    def new_game(self, session):
+        """Returns the game for a new *session*"""
+        return SessionGame(session, self.size, self.map, self.symbols,
+                           self.Display, level=self.level)
+
+    async def handle(self, reader, writer):
+        """Plays one game with a client until it ends or disconnects"""
+        writer.write(CHARACTER_MODE)
+        session = Session(self, writer)
+        self.sessions.add(session)
+        try:
+            while session in self.sessions:
+                data = await reader.read(1024)
+                if not data:
+                    break
+                session.feed(data)
+        except ConnectionError:
+            # Reset by the client, gone just like at the end of the stream
+            pass
+        finally:
+            self.end(session)
+
+    def end(self, session):
+        """Removes *session* and closes its connection"""
+        self.sessions.discard(session)
+        session.writer.close()
+
+    def each(self, method):
+        """Calls *method* with every session, ending those whose game ends"""
+        for session in list(self.sessions):
+            try:
+                method(session)
+            except SessionOver:
+                self.end(session)
+
+    async def simulate(self):
+        """Ticks every session *TPS* times per second, on a fixed schedule
+        that starts over after a stall instead of bursting to catch up
+        """
+        pacer = Pacer(self.TPS)
+
+        while True:
+            for tick in range(pacer.due()):
+                self.each(Session.tick)
+            await asyncio.sleep(max(pacer.delay(), 0))
+
+    async def render(self):
+        """Sends every session its frames, skipping frames for clients that
+        are idle or can't keep up
+        """
+        loop = asyncio.get_running_loop()
+        next_frame = loop.time()
+        skip = max(self.FPS // self.idle_FPS, 1)
+        frame = 0
+
+        def render(session):
+            if session.writer.is_closing():
+                # Gone, handle ends the session
+                return None
+            if frame % skip and now - session.active > self.idle:
+                return None
+            if session.writer.transport.get_write_buffer_size() > BACKLOG:
+                return None
+            session.render()
+
+        while True:
+            now = time.perf_counter()
+            self.each(render)
+            frame += 1
+
+            next_frame = max(next_frame + 1 / self.FPS, loop.time())
+            await asyncio.sleep(next_frame - loop.time())
+
+    async def serve(self, host='127.0.0.1', port=4000):
+        """Accepts clients on *host*:*port* and runs all games"""
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await asyncio.gather(self.simulate(), self.render())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Host Frogger games, play with: telnet localhost 4000")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=4000)
+    parser.add_argument('-l', '--level', metavar='FILE',
+                        help="play a level compiled with Level.py")
+    parser.add_argument('-a', '--array', action='store_true',
+                        help="use the numpy backed ArrayGD display")
+    parser.add_argument('--lines', type=int, default=24,
+                        help="lines of the clients' terminals")
+    parser.add_argument('--columns', type=int, default=80,
+                        help="columns of the clients' terminals")
+    args = parser.parse_args()
+
+    level = Level(args.level, symbols) if args.level else None
+    server = Server(symbols, level=level,
+                    Display=ArrayGD if args.array else GD,
+                    size=(args.lines, args.columns))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,284 @@
+import sys
+import time
+import random
+import argparse
+
+from Frogger import Game, maze2, symbols
+from Game_Display import GD
+from Array_Display import ArrayGD
+from Level import Level
+from Endless import EndlessGame
+from Output import NullWriter
+
+
+# Keyboard input mapped to the moves understood by Player.update
+MOVES = {'w': "Up", 's': "Down", 'a': "Left", 'd': "Right"}
+
+
+class GameOver(Exception):
+    """Raised by a HeadlessGame when the game ends"""
+
+
+class Headless(object):
+    """
+    Mixin for Games that never touch the terminal: no input thread, no
+    printing and no sleeping. Frames go to a NullWriter. Dying or quitting
+    raises GameOver instead of exiting.
+    """
+
+    # Why the player died, None while alive
+    death = None
+    # Lines and columns of the screen frames are made for, None for the
+    # whole map
+    size = None
+
+    def __init__(self, *args, **kwargs):
+        super(Headless, self).__init__(*args, **kwargs)
+        self.out = NullWriter()
+
+    def screen_size(self):
+        """Overrides Game method, there is no terminal to ask"""
+        if self.size is None:
+            return len(self.GD.map) + 1, len(self.GD.map[0])
+        return self.size
+
+    def dead(self, message=' '):
+        """Overrides Game method, remembers why the player died"""
+        self.death = message
+        raise GameOver(message)
+
+    def kill(self):
+        """Overrides Game method, there is no thread or terminal to clean up"""
+        raise GameOver(self.death)
+
+
+class HeadlessGame(Headless, Game):
+    """Game without terminal, see Headless"""
+
+
+class HeadlessEndlessGame(Headless, EndlessGame):
+    """EndlessGame without terminal, see Headless"""
+
+
+def scale_map(map, width=1, height=1):
+    """
+    Tiles the inner rows of *map* *width* times horizontally and *height*
+    times vertically, keeping the top and bottom border and a single
+    player in the bottom row.
+
+    :param map: <list> A list of strings containing simple map
+    :return: <list> The bigger map as a list of strings
+    """
+    inner = [(line * width).replace('H', ' ') for line in map[1:-1]]
+    rows = [map[0] * width] + inner * height + [map[-1] * width]
+
+    # Put the player back in the middle of the last inner row
+    start = rows[-2]
+    mid = len(start) // 2
+    rows[-2] = start[:mid] + 'H' + start[mid + 1:]
+    return rows
+
+
+def group(movers):
+    """Groups *movers* by object type, keeping their order"""
+    groups = {}
+    for mover in movers:
+        groups.setdefault(mover.kind.__name__, []).append(mover)
+    return groups
+
+
+def run(game, ticks, moves='', every=10, render=0):
+    """
+    Runs *game* for *ticks* ticks as fast as possible
+
+    :param game: <HeadlessGame> The game to simulate
+    :param ticks: <int> How many times to update the map
+    :param moves: <str> Keys from MOVES, one is played every *every* ticks,
+                  any other character means no move
+    :param every: <int> Ticks between two scripted moves
+    :param render: <int> Ticks between two frames printed to game.out,
+                   0 for none
+    :return: <dict> Ticks done, total time and update time per object type
+    """
+    # Group objects by type, in the same order as Game.update_map
+    movers = game.movers
+    groups = group(movers)
+    costs = dict.fromkeys(groups, 0.0)
+    costs['Player'] = 0.0
+    if render:
+        costs['render'] = 0.0
+
+    clock = time.perf_counter
+    start = clock()
+    first = game.tick
+    try:
+        for tick in range(ticks):
+            game.tick = first + tick
+            step, rest = divmod(tick, every)
+            if rest == 0 and step < len(moves) and moves[step] in MOVES:
+                t = clock()
+                game.player.update(MOVES[moves[step]])
+                costs['Player'] += clock() - t
+
+            # Lines come and go in an EndlessGame
+            if game.movers is not movers:
+                movers = game.movers
+                groups = group(movers)
+                for name in groups:
+                    costs.setdefault(name, 0.0)
+
+            for name, things in groups.items():
+                t = clock()
+                for mover in things:
+                    mover.update()
+                costs[name] += clock() - t
+
+            if render and tick % render == 0:
+                t = clock()
+                game.print_game()
+                costs['render'] += clock() - t
+        game.tick = first + ticks
+    except GameOver:
+        pass
+
+    return {'ticks': game.tick - first,
+            'time': clock() - start,
+            'costs': costs,
+            'death': game.death}
+
+
+def check_fast_forward(make, ticks):
+    """
+    Advances two games made by *make* *ticks* ticks, one with fast_forward
+    and one by stepping through them, and compares where they end up
+
+    :param make: <function> Makes the same headless game on every call
+    :return: <list> What differs: 'death', 'state' (see state_hash) or
+             'map' (what is painted), empty if they agree
+    """
+    from Replay import state_hash
+
+    fast, stepped = make(), make()
+    try:
+        fast.fast_forward(ticks)
+    except GameOver:
+        pass
+    try:
+        for tick in range(ticks):
+            stepped.update_map()
+    except GameOver:
+        pass
+
+    def rows(game):
+        return game.GD.rows([0, len(game.GD.map)], [0, len(game.GD.map[0])])
+
+    differs = []
+    if fast.death != stepped.death:
+        differs.append('death')
+    if state_hash(fast) != state_hash(stepped):
+        differs.append('state')
+    if rows(fast) != rows(stepped):
+        differs.append('map')
+    return differs
+
+
+def report(stats, file=sys.stdout):
+    """Prints the result of run as a small table"""
+    ticks, elapsed = stats['ticks'], stats['time']
+    print("Ticks: {}  Time: {:.3f}s  Ticks/sec: {:.1f}".format(
+        ticks, elapsed, ticks / elapsed if elapsed else 0), file=file)
+
+    for name, cost in stats['costs'].items():
+        per_tick = cost / ticks * 1e6 if ticks else 0
+        print("{:<10} {:>9.3f}s {:>10.1f}us/tick".format(
+            name, cost, per_tick), file=file)
+
+    if stats['death'] is not None:
+        print("Died at tick {}: {}".format(ticks, stats['death']), file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run Frogger headless and measure update speed")
+    parser.add_argument('-t', '--ticks', type=int, default=10000)
+    parser.add_argument('-W', '--width', type=int, default=1,
+                        help="tile the map this many times horizontally")
+    parser.add_argument('-H', '--height', type=int, default=1,
+                        help="tile the map this many times vertically")
+    parser.add_argument('-m', '--moves', default='',
+                        help="scripted keys (w, a, s, d), others mean wait")
+    parser.add_argument('-e', '--every', type=int, default=10,
+                        help="ticks between two scripted moves")
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('-a', '--array', action='store_true',
+                        help="use the numpy backed ArrayGD display")
+    parser.add_argument('--no-lanes', dest='lanes', action='store_false',
+                        help="update every object on its own")
+    parser.add_argument('-v', '--view', type=int, default=None,
+                        help="only paint this many lines around the player")
+    parser.add_argument('-c', '--columns', type=int, default=None,
+                        help="only paint this many columns around the "
+                             "player")
+    parser.add_argument('-l', '--level', metavar='FILE',
+                        help="load a level compiled with Level.py instead "
+                             "of tiling the map")
+    parser.add_argument('--endless', action='store_true',
+                        help="play a generated map without end, as tall "
+                             "and wide as the tiled map")
+    parser.add_argument('-f', '--fast-forward', type=int, default=0,
+                        help="skip this many ticks at once before running")
+    parser.add_argument('-r', '--render', type=int, default=0,
+                        help="also render a frame every this many ticks, "
+                             "written nowhere")
+    parser.add_argument('--check', action='store_true',
+                        help="check that fast-forwarding --ticks ticks ends "
+                             "like stepping through them, instead of "
+                             "measuring")
+    args = parser.parse_args(argv)
+
+    # Every game made is the same, also without --seed
+    seed = random.randrange(2 ** 32) if args.seed is None else args.seed
+    Display = ArrayGD if args.array else GD
+    level = Level(args.level, symbols) if args.level else None
+
+    def make():
+        random.seed(seed)
+        if args.endless:
+            return HeadlessEndlessGame(symbols, seed, len(maze2) * args.height,
+                                       len(maze2[0]) * args.width,
+                                       Display=Display, lanes=args.lanes)
+        return HeadlessGame(scale_map(maze2, args.width, args.height),
+                            symbols, Display, args.lanes, level)
+
+    if args.check:
+        differs = check_fast_forward(make, args.ticks)
+        print("Fast-forwarding {} ticks (seed {}): {}".format(
+            args.ticks, seed, ', '.join(differs) + " differ" if differs
+            else "same as stepping"))
+        sys.exit(1 if differs else 0)
+
+    game = make()
+    if args.view or args.columns:
+        # All of the map where no limit is given, plus the help line
+        lines = args.view or len(game.GD.map)
+        columns = args.columns or len(game.GD.map[0])
+        game.size = (lines + 1, columns)
+        # Frames keep the view around the player, the first one sets it
+        # before the first update
+        game.render_game()
+    if args.fast_forward:
+        start = time.perf_counter()
+        try:
+            game.fast_forward(args.fast_forward)
+        except GameOver:
+            pass
+        print("Fast-forwarded {} ticks in {:.3f}s".format(
+            game.tick, time.perf_counter() - start))
+        if game.death is not None:
+            print("Died at tick {}: {}".format(game.tick, game.death))
+            return None
+    report(run(game, args.ticks, args.moves, args.every, args.render))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import sys
+import bisect
+import struct
+from array import array
+
+from Lanes import Lane
+
+
+MAGIC = b'FRGS'
+DELTA = b'FRGD'
+VERSION = 2
+
+# Magic, version and number of columns
+HEADER = struct.Struct('<4sII')
+# Name of a column and how many values follow, little-endian int32s. A
+# delta has as many indexes first, then the values at them.
+COLUMN = struct.Struct('<8sI')
+# Length of a checkpoint in a checkpoint file
+LENGTH = struct.Struct('<I')
+
+# EntityStore arrays a snapshot holds
+STORE = ('y', 'x', 'first', 'length', 'move', 'speed', 'cycle')
+# Turns act_map cells into code points as ints of this machine
+CODEC = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+
+
+def lanes(game):
+    """Returns the Lanes of *game* in update order"""
+    return [i for i in game.movers if isinstance(i, Lane)]
+
+
+def capture(game):
+    """
+    Collects everything that decides how *game* goes on as columns of
+    ints: the tick, the player, the action map, the EntityStore and where
+    every Lane is in its scroll cycle
+
+    :return: <dict> array('i') of values by column name
+    """
+    store = game.entities
+    player = game.player
+    columns = {'tick': array('i', [game.tick]),
+               'player': array('i', [player.coords[0], player.coords[1],
+                                     ord(player.replace)])}
+
+    cells = array('i')
+    cells.frombytes(''.join(''.join(i) for i in game.act_map).encode(CODEC))
+    columns['act_map'] = cells
+
+    for name in STORE:
+        columns[name] = array('i', getattr(store, name))
+
+    columns['lanes'] = array('i')
+    for lane in lanes(game):
+        columns['lanes'].extend([lane.offset, lane.cycle_count, lane.synced,
+                                 lane.frame])
+    return columns
+
+
+def apply(game, columns):
+    """
+    Puts *game* in the state of *columns* as returned by capture, then
+    rebuilds the cell index and repaints the map. The game has to be made
+    like the one captured: from the same map and with the same seed, since
+    the random speeds decide which objects move together as Lanes.
+    """
+    store, GD = game.entities, game.GD
+    height, width = len(game.act_map), len(game.act_map[0])
+    moving = lanes(game)
+    if (len(columns['act_map']) != height * width
+            or len(columns['x']) != len(store.x)
+            or columns['speed'] != array('i', store.speed)
+            or len(columns['lanes']) != len(moving) * 4):
+        raise ValueError("Snapshot is of another game")
+
+    game.tick = columns['tick'][0]
+    y, x, replace = columns['player']
+    game.player.coords = [y, x]
+    game.player.replace = chr(replace)
+
+    cells = columns['act_map'].tobytes().decode(CODEC)
+    for i, row in enumerate(game.act_map):
+        row[:] = cells[i * width:(i + 1) * width]
+
+    for name in STORE:
+        values = getattr(store, name)
+        values[:] = array(values.typecode, columns[name])
+
+    GD.offsets = {}
+    for i, lane in enumerate(moving):
+        (lane.offset, lane.cycle_count, lane.synced,
+         lane.frame) = columns['lanes'][i * 4:i * 4 + 4]
+        GD.offsets[lane.y] = lane.offset
+
+    # The index follows from the coords, Lanes then bring theirs up to
+    # their offset
+    GD.cells = {}
+    for mover in game.movers:
+        for thing in getattr(mover, 'things', [mover]):
+            for i, coords in enumerate(thing.coords):
+                GD.add_piece(GD.to_act(coords), (thing, i))
+
+    game.repaint_all()
+
+
+def encode(columns):
+    """Returns *columns* as a full snapshot"""
+    parts = [HEADER.pack(MAGIC, VERSION, len(columns))]
+    for name, values in columns.items():
+        parts.append(COLUMN.pack(name.encode(), len(values)))
+        parts.append(pack(values))
+    return b''.join(parts)
+
+
+def decode(blob):
+    """Returns the columns of the full snapshot *blob*"""
+    return {name: unpack(blob, start, count)
+            for name, count, start in read(blob, MAGIC)}
+
+
+def diff(old, new):
+    """
+    Returns a delta holding only the values of the columns *new* that
+    differ from the columns *old*, see patch
+    """
+    parts = []
+    for name, values in new.items():
+        base = old[name]
+        if len(base) != len(values):
+            raise ValueError("Column {} changed its length".format(name))
+        if values == base:
+            continue
+
+        changed = array('i', [i for i in range(len(values))
+                              if values[i] != base[i]])
+        parts.append(COLUMN.pack(name.encode(), len(changed)))
+        parts.append(pack(changed))
+        parts.append(pack(array('i', [values[i] for i in changed])))
+    return HEADER.pack(DELTA, VERSION, len(parts) // 3) + b''.join(parts)
+
+
+def patch(columns, delta):
+    """Returns *columns* with the changes in *delta* applied, columns
+    that change are copied
+    """
+    columns = dict(columns)
+    for name, count, start in read(delta, DELTA):
+        indexes = unpack(delta, start, count)
+        values = unpack(delta, start + count * 4, count)
+        column = columns[name] = array('i', columns[name])
+        for i, value in zip(indexes, values):
+            column[i] = value
+    return columns
+
+
+def read(blob, magic):
+    """
+    Goes through the columns of a snapshot or delta
+
+    :return: <generator> Name, number of values and where they start
+    """
+    if len(blob) < HEADER.size:
+        raise ValueError("Not a snapshot")
+    found, version, count = HEADER.unpack_from(blob)
+    if found != magic:
+        raise ValueError("Not a {}".format(
+            "snapshot" if magic == MAGIC else "delta"))
+    if version != VERSION:
+        raise ValueError("Snapshot has version {}, not {}".format(
+            version, VERSION))
+
+    start = HEADER.size
+    for i in range(count):
+        name, length = COLUMN.unpack_from(blob, start)
+        start += COLUMN.size
+        yield name.rstrip(b'\0').decode(), length, start
+        # Deltas hold indexes and values
+        start += length * 4 * (1 if magic == MAGIC else 2)
+
+
+def pack(values):
+    """Returns the ints *values* as little-endian bytes"""
+    if sys.byteorder == 'big':
+        values = array('i', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack(blob, start, count):
+    """Returns *count* little-endian ints of *blob* from *start* on"""
+    values = array('i')
+    values.frombytes(blob[start:start + count * 4])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class Checkpoints(object):
+    """
+    Checkpoints of one game to go back to. Every *full*-th one is a full
+    snapshot, the ones in between only deltas against the one before, so
+    they are cheap to take often. If a *path* is given, every checkpoint
+    is also appended to that file, and load gets them back after a crash
+    or on another machine.
+    """
+
+    def __init__(self, full=10, path=None):
+        """
+        :param full: <int> Checkpoints from one full snapshot to the next
+        :param path: <str> File to append the checkpoints to
+        """
+        self.full = full
+        self.path = path
+        # Tick and snapshot or delta of every checkpoint
+        self.ticks = []
+        self.blobs = []
+        # Columns of the last checkpoint, the next delta is made against
+        self._last = None
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def save(self, game):
+        """Takes a checkpoint of *game*"""
+        columns = capture(game)
+        if self._last is None or len(self.blobs) % self.full == 0:
+            blob = encode(columns)
+        else:
+            blob = diff(self._last, columns)
+        self._last = columns
+        self.ticks.append(game.tick)
+        self.blobs.append(blob)
+
+        if self.path is not None:
+            with open(self.path, 'ab') as f:
+                f.write(LENGTH.pack(len(blob)) + blob)
+        return blob
+
+    def columns(self, n):
+        """Returns the columns of checkpoint *n*, from the full snapshot
+        before it and the deltas up to it
+        """
+        start = n
+        while self.blobs[start][:4] != MAGIC:
+            start -= 1
+        columns = decode(self.blobs[start])
+        for delta in self.blobs[start + 1:n + 1]:
+            columns = patch(columns, delta)
+        return columns
+
+    def restore(self, game, n=-1):
+        """Puts *game* back to checkpoint *n*, the last one by default"""
+        if n < 0:
+            n += len(self.blobs)
+        apply(game, self.columns(n))
+
+    def rewind(self, game, tick):
+        """
+        Puts *game* back to the last checkpoint taken at or before *tick*
+        and forgets the ones after it, the game goes on from there
+        """
+        n = bisect.bisect_right(self.ticks, tick) - 1
+        if n < 0:
+            raise ValueError("No checkpoint at or before tick {}".format(tick))
+
+        self._last = self.columns(n)
+        apply(game, self._last)
+        del self.ticks[n + 1:]
+        del self.blobs[n + 1:]
+
+        if self.path is not None:
+            with open(self.path, 'wb') as f:
+                f.write(b''.join(LENGTH.pack(len(i)) + i for i in self.blobs))
+
+    @classmethod
+    def load(cls, path, full=10):
+        """Reads the checkpoints appended to *path*, more are appended"""
+        checkpoints = cls(full, path)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        start = 0
+        while start + LENGTH.size <= len(data):
+            length, = LENGTH.unpack_from(data, start)
+            start += LENGTH.size
+            blob = data[start:start + length]
+            if len(blob) < length:
+                # Cut off by a crash while writing
+                break
+            start += length
+            checkpoints.blobs.append(blob)
+
+        columns = None
+        for blob in checkpoints.blobs:
+            if blob[:4] == MAGIC:
+                columns = decode(blob)
+            else:
+                columns = patch(columns, blob)
+            checkpoints.ticks.append(columns['tick'][0])
+        if checkpoints.blobs:
+            checkpoints._last = columns
+        return checkpoints
@@ -1,3 +1,9 @@
+import os
+import sys
+import selectors
+import collections
+
+
 class _Getch:
     """Gets a single character from standard input.  Does not echo to the
 screen."""
@@ -36,3 +42,115 @@ class _GetchWindows:
 
 
 getch = _Getch()
+
+
+class KeyReader:
+    """Collects key presses without blocking. On Unix the terminal is put
+into cbreak mode once by start() and restored by close(), keys are read
+whenever stdin is readable. Keeps at most *size* keys, dropping the
+oldest."""
+    def __init__(self, size=16):
+        self.keys = collections.deque(maxlen=size)
+        try:
+            self.impl = _KeyReaderWindows(self.keys)
+        except ImportError:
+            self.impl = _KeyReaderUnix(self.keys)
+
+    def start(self): self.impl.start()
+
+    def close(self): self.impl.close()
+
+    def fileno(self): return self.impl.fileno()
+
+    def poll(self):
+        """Moves every key that is waiting into the buffer"""
+        self.impl.poll()
+
+    def drain(self):
+        """Returns all buffered keys, oldest first, and empties the buffer"""
+        self.poll()
+        keys = list(self.keys)
+        self.keys.clear()
+        return keys
+
+
+class _KeyReaderUnix:
+    def __init__(self, keys):
+        import termios
+        self.keys = keys
+        self.fd = None
+        self.selector = None
+
+    def fileno(self):
+        return self.fd if self.fd is not None else sys.stdin.fileno()
+
+    def start(self):
+        import tty, termios
+        self.fd = sys.stdin.fileno()
+        self.old_settings = termios.tcgetattr(self.fd)
+        tty.setcbreak(self.fd)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.fd, selectors.EVENT_READ)
+
+    def close(self):
+        import termios
+        if self.selector is None:
+            return
+        self.selector.close()
+        self.selector = None
+        termios.tcsetattr(self.fd, termios.TCSADRAIN, self.old_settings)
+
+    def poll(self):
+        if self.selector is None:
+            return
+        while self.selector.select(timeout=0):
+            data = os.read(self.fd, 1024)
+            if not data:
+                break
+            self.keys.extend(data.decode(errors='ignore'))
+
+
+class _KeyReaderWindows:
+    def __init__(self, keys):
+        import msvcrt
+        self.keys = keys
+
+    def fileno(self):
+        return sys.stdin.fileno()
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def poll(self):
+        import msvcrt
+        while msvcrt.kbhit():
+            self.keys.append(msvcrt.getwch())
+
+
+class KeyBuffer:
+    """Collects keys handed to it with feed(), e.g. from a network
+connection, with the same interface as KeyReader. Keeps at most *size*
+keys, dropping the oldest."""
+    def __init__(self, size=16):
+        self.keys = collections.deque(maxlen=size)
+
+    def start(self): pass
+
+    def close(self): pass
+
+    def fileno(self): return None
+
+    def feed(self, text):
+        """Adds the keys in *text* to the buffer"""
+        self.keys.extend(text)
+
+    def poll(self): pass
+
+    def drain(self):
+        """Returns all buffered keys, oldest first, and empties the buffer"""
+        keys = list(self.keys)
+        self.keys.clear()
+        return keys